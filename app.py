@@ -1,5 +1,27 @@
-from flask import Flask, jsonify, request, render_template # Importa classes e funções necessárias do framework Flask para criar a API e servir HTML.
-import re # Importa o módulo 're' (Regular Expressions), essencial para buscar e extrair dados formatados nos arquivos RIP.
+from flask import Flask, Request, g, jsonify, request, render_template, url_for # Importa classes e funções necessárias do framework Flask para criar a API e servir HTML.
+import atexit # Importa o módulo 'atexit', usado para gravar o histórico pendente ao encerrar o servidor.
+import datetime # Importa o módulo 'datetime', usado para validar as datas das consultas ao histórico.
+import io # Importa o módulo 'io', usado para obter o tamanho dos arquivos enviados (io.SEEK_END).
+import math # Importa o módulo 'math', usado para identificar as cores sem densidade (NaN).
+import multiprocessing # Importa o módulo 'multiprocessing', usado para escolher como os processos do pool são iniciados.
+import os # Importa o módulo 'os', usado para ler as configurações das variáveis de ambiente.
+import shutil # Importa o módulo 'shutil', usado para copiar os arquivos enviados para os jobs.
+import sqlite3 # Importa o módulo 'sqlite3', cujos erros desativam o histórico quando o banco não pode ser aberto.
+import tempfile # Importa o módulo 'tempfile', usado para guardar os arquivos dos jobs até o processamento.
+import threading # Importa o módulo 'threading', usado para criar o pool de processos uma única vez.
+from concurrent.futures import ProcessPoolExecutor # Pool de processos usado no modo paralelo.
+from functools import partial # Usado para adiar a obtenção do 'sum_dots' de cada arquivo.
+
+from werkzeug.datastructures import FileStorage # Representa as cópias dos arquivos enviados para os jobs.
+
+from cache_dots import CacheDots, hash_conteudo # Importa o cache LRU dos totais de dots já calculados por arquivo.
+from compactados import CompactadoInvalidoError, LimiteCompactadoError, e_compactado, iterar_membros # Leitura de pacotes .zip/.tar.gz.
+from historico import AGRUPAMENTOS, HistoricoConsumo # Histórico dos resultados calculados (SQLite).
+from fila_jobs import FilaJobs, FilaCheiaError, PENDENTE # Importa a fila de jobs executados em segundo plano.
+from metricas import ATIVADO as METRICAS_ATIVADAS, contar, encerrar_medicao, iniciar_medicao, medicao_atual, medir, registro as registro_metricas # Métricas por etapa.
+from sessoes import GerenciadorSessoes, LimiteSessaoError, SessaoInexistenteError # Sessões de upload com recálculo incremental.
+from motor_consumo import MotorConsumo # Importa o motor vetorizado que calcula o consumo de todas as linhas.
+from leitor_rip import extrair_canais, somar_canais, somar_canais_caminho, somar_canais_conteudo, FormatoDesconhecidoError, TAMANHO_MINIMO_MMAP # Importa o leitor incremental que extrai os registros dos arquivos RIP.
 
 app = Flask(__name__) # Cria a instância principal da aplicação Flask, definindo-a como o servidor web.
 
@@ -158,7 +180,497 @@ MAPA_LINHAS = {
     }
 }
 
+# Matrizes de densidades e gotas de todas as linhas, compiladas uma única vez na inicialização.
+motor_consumo = MotorConsumo(MAPA_LINHAS)
+
+# --- Cache de Arquivos Já Processados ---
+# Limites configuráveis por variáveis de ambiente (CONSUMO_CACHE_MAX_ENTRADAS=0 desativa o cache).
+cache_dots = CacheDots(
+    max_entradas=int(os.environ.get("CONSUMO_CACHE_MAX_ENTRADAS", 256)), # Número máximo de arquivos guardados.
+    max_bytes=int(os.environ.get("CONSUMO_CACHE_MAX_BYTES", 16 * 1024 * 1024)) # Memória máxima estimada (bytes).
+)
+
+# --- Histórico de Consumo ---
+# Banco SQLite onde cada resultado calculado é gravado (em lotes, em segundo plano).
+# CONSUMO_HISTORICO_DB define o arquivo; vazio desativa o histórico.
+HISTORICO_DB = os.environ.get("CONSUMO_HISTORICO_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico.db"))
+
+def _abrir_historico():
+    """Abre o banco do histórico; se ele não puder ser criado (ex: disco somente leitura), o histórico fica desativado."""
+    if not HISTORICO_DB:
+        return None
+    try:
+        historico = HistoricoConsumo(
+            HISTORICO_DB,
+            tamanho_lote=int(os.environ.get("CONSUMO_HISTORICO_LOTE", 500)), # Resultados gravados por transação.
+            max_pendentes=int(os.environ.get("CONSUMO_HISTORICO_MAX_PENDENTES", 10000)) # Acima disso, novos resultados são descartados.
+        )
+    except sqlite3.Error:
+        app.logger.warning("Histórico desativado: não foi possível abrir %s", HISTORICO_DB, exc_info=True)
+        return None
+    atexit.register(historico.gravar_pendentes) # Não perde os resultados ainda na fila ao encerrar.
+    return historico
+
+historico = _abrir_historico()
+
+def registrar_historico(linha, fator_porcentagem, chaves, resultado):
+    """Enfileira o resultado no histórico (sem esperar a gravação). Não faz nada se o histórico estiver desativado."""
+    if historico is not None:
+        historico.registrar(linha, round(fator_porcentagem * 100, 6), chaves, resultado)
+
+# --- Erros ---
+class ErroConsumo(Exception):
+    """Erro de validação ou de leitura que deve ser devolvido ao cliente como {"error": mensagem}."""
+
+    def __init__(self, mensagem, motivo, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem # Mensagem exibida ao usuário.
+        self.motivo = motivo # Identificador curto do erro (rótulo da métrica 'consumo_erros_total').
+        self.status = status # Status HTTP da resposta.
+
+# --- Funções de Processamento ---
+def somar_dots(canais):
+    """
+    Acumula os dots por cor e nível a partir das tuplas (cor, l1, l2, l3) de um arquivo.
+    Retorna o dicionário 'sum_dots' com as cores já normalizadas, na ordem de primeira aparição.
+    """
+    return normalizar_cores(somar_canais(canais))
+
+def normalizar_cores(totais):
+    """
+    Converte os totais por nome de cor do arquivo ({cor: [l1, l2, l3]}, de 'somar_canais') no 'sum_dots',
+    corrigindo e normalizando os nomes (nomes diferentes da mesma cor são somados).
+    """
+    sum_dots = {} # Dicionário para acumular dots por cor deste arquivo.
+
+    for cor_en, (dots_l1, dots_l2, dots_l3) in totais.items(): # Itera sobre as cores do arquivo, na ordem de aparição.
+        cor_en = COR_MAP_ERROS.get(cor_en.upper(), cor_en.capitalize()) # Corrige e normaliza o nome da cor.
+
+        if cor_en not in sum_dots:
+            sum_dots[cor_en] = {'l1': 0, 'l2': 0, 'l3': 0} # Inicializa a contagem se for a primeira vez.
+
+        sum_dots[cor_en]['l1'] += dots_l1 # Acumula dots do Nível 1.
+        sum_dots[cor_en]['l2'] += dots_l2 # Acumula dots do Nível 2.
+        sum_dots[cor_en]['l3'] += dots_l3 # Acumula dots do Nível 3.
+
+    return sum_dots
+
+def somar_dots_arquivo(stream):
+    """
+    Retorna (chave, sum_dots, tamanho) de um arquivo enviado, consultando antes o cache pelo hash do conteúdo.
+    Em caso de 'miss', lê os registros do stream e guarda o resultado no cache.
+    Propaga FormatoDesconhecidoError (que nunca é guardado no cache).
+    """
+    medicao = medicao_atual()
+    tamanho = stream.seek(0, io.SEEK_END) # Tamanho do arquivo (o hash volta o stream ao início).
+    with medir('hash'):
+        chave = hash_conteudo(stream) # Hash do conteúdo do arquivo (o stream volta ao início).
+    sum_dots = cache_dots.obter(chave)
+    if sum_dots is None: # Arquivo ainda não processado: lê e extrai os registros.
+        sum_dots = somar_dots(extrair_canais(stream, tempos=medicao.etapas if medicao else None))
+        cache_dots.guardar(chave, sum_dots)
+    return chave, sum_dots, tamanho
+
+def somar_dots_membro(leitor):
+    """
+    Retorna (chave, sum_dots, tamanho) de um membro de arquivo compactado. O membro é lido uma única vez (o hash
+    é calculado durante a leitura), por isso o cache não é consultado, apenas atualizado.
+    """
+    medicao = medicao_atual()
+    try:
+        sum_dots = somar_dots(extrair_canais(leitor, tempos=medicao.etapas if medicao else None))
+    except (LimiteCompactadoError, CompactadoInvalidoError) as erro: # Falha ao descompactar o membro.
+        raise _erro_compactado(erro)
+    chave = leitor.hash.hexdigest()
+    cache_dots.guardar(chave, sum_dots) # Um reenvio do mesmo arquivo avulso usará o cache.
+    return chave, sum_dots, leitor.bytes_lidos # Tamanho descompactado.
+
+# --- Arquivos Compactados (.zip / .tar.gz) ---
+# Limites por pacote contra "zip bombs" (número de arquivos e total de bytes descompactados).
+COMPACTADO_MAX_MEMBROS = int(os.environ.get("CONSUMO_COMPACTADO_MAX_MEMBROS", 1000))
+COMPACTADO_MAX_BYTES = int(os.environ.get("CONSUMO_COMPACTADO_MAX_BYTES", 512 * 1024 * 1024))
+
+def expandir_compactado(arquivo):
+    """
+    Gera pares (nome_membro, obter_sum_dots) para cada arquivo dentro de um pacote enviado.
+    Lança ErroConsumo se o pacote for inválido, exceder os limites ou não contiver nenhum arquivo.
+    """
+    membros = iterar_membros(arquivo.stream, arquivo.filename, COMPACTADO_MAX_MEMBROS, COMPACTADO_MAX_BYTES)
+    vazio = True
+    try:
+        for leitor in membros:
+            vazio = False
+            yield leitor.nome, partial(somar_dots_membro, leitor)
+    except (LimiteCompactadoError, CompactadoInvalidoError) as erro: # Pacote inválido ou acima dos limites.
+        raise _erro_compactado(erro)
+    if vazio: # Como um arquivo avulso sem registros, um pacote sem arquivos é um erro.
+        raise ErroConsumo(f"Nenhum arquivo encontrado em {arquivo.filename}", "compactado_vazio")
+
+def _erro_compactado(erro):
+    """Converte um erro de leitura de pacote no ErroConsumo devolvido ao cliente (a mensagem cita o membro)."""
+    motivo = "compactado_limite" if isinstance(erro, LimiteCompactadoError) else "compactado_invalido"
+    return ErroConsumo(str(erro), motivo)
+
+# --- Processamento Paralelo (Opcional) ---
+# Desativado por padrão: CONSUMO_PARALELO_PROCESSOS define o número de processos (0 = sempre sequencial).
+# Lotes com menos de CONSUMO_PARALELO_MIN_ARQUIVOS arquivos continuam no caminho sequencial (sem custo do pool).
+# Arquivos pequenos são enviados ao pool pelo conteúdo; os grandes (a partir de TAMANHO_MINIMO_MMAP) são gravados
+# em arquivos temporários com nome, que cada processo do pool abre pelo caminho e varre por mmap.
+PARALELO_PROCESSOS = int(os.environ.get("CONSUMO_PARALELO_PROCESSOS", 0))
+PARALELO_MIN_ARQUIVOS = int(os.environ.get("CONSUMO_PARALELO_MIN_ARQUIVOS", 8))
+PARALELO_EM_ANDAMENTO = 2 * PARALELO_PROCESSOS # Arquivos enviados ao pool e ainda não consumidos (limita a memória usada).
+
+_pool_processos = None # Pool criado sob demanda no primeiro lote grande.
+_trava_pool = threading.Lock()
+
+def _gravar_com_nome(tamanho):
+    """Indica se um upload de 'tamanho' bytes (None = desconhecido) deve ir para um arquivo temporário com nome."""
+    return PARALELO_PROCESSOS > 0 and os.name == "posix" and (tamanho is None or tamanho >= TAMANHO_MINIMO_MMAP)
+
+class RequisicaoConsumo(Request):
+    """Requisição cujos uploads grandes, no modo paralelo, são gravados em arquivos que o pool pode abrir pelo caminho."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if _gravar_com_nome(total_content_length):
+            return tempfile.NamedTemporaryFile("w+b", prefix="consumo-") # Apagado quando a requisição fecha os arquivos.
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+app.request_class = RequisicaoConsumo
+
+def _obter_pool():
+    """
+    Retorna o pool de processos compartilhado, criando-o na primeira chamada. Os processos são
+    iniciados por 'forkserver' (ou 'spawn'), pois a aplicação já tem threads (fila de jobs e histórico)
+    e um 'fork' a partir dela pode travar.
+    """
+    global _pool_processos
+    with _trava_pool:
+        if _pool_processos is None:
+            metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            contexto = multiprocessing.get_context(metodo)
+            if metodo == "forkserver": # Por padrão, o servidor de processos importa o '__main__', que pode importar a aplicação (e iniciar suas threads).
+                contexto.set_forkserver_preload(["leitor_rip"])
+            _pool_processos = ProcessPoolExecutor(max_workers=PARALELO_PROCESSOS, mp_context=contexto)
+        return _pool_processos
+
+def preparar_sum_dots(arquivos):
+    """
+    Gera, na ordem de envio, pares (nome, obter_sum_dots), onde 'obter_sum_dots()' retorna
+    (chave, sum_dots, tamanho em bytes) do arquivo ou lança a mesma exceção do caminho sequencial (FormatoDesconhecidoError).
+    Pacotes .zip/.tar.gz são expandidos no lugar, membro a membro.
+
+    No modo paralelo, os arquivos avulsos que não estão no cache são enviados ao pool à frente do
+    consumo, com no máximo PARALELO_EM_ANDAMENTO arquivos enviados e ainda não consumidos. Os membros
+    de pacotes e os arquivos grandes sem caminho no disco (ex: em memória) continuam no processo
+    principal. Se a geração for interrompida (ex: um arquivo com erro), os arquivos ainda não
+    iniciados pelo pool são cancelados.
+    """
+    paralelo = PARALELO_PROCESSOS > 0 and len(arquivos) >= PARALELO_MIN_ARQUIVOS # Lotes pequenos ficam no caminho sequencial.
+    no_pool = [paralelo and not e_compactado(arquivo.filename)
+               and (_tamanho(arquivo.stream) < TAMANHO_MINIMO_MMAP or _caminho(arquivo.stream) is not None)
+               for arquivo in arquivos]
+    enviados = {} # Índice do arquivo -> (obter_sum_dots, futuro ou None se veio do cache).
+    em_andamento = [] # Futuros enviados ao pool e ainda não consumidos.
+    proximo = 0 # Próximo arquivo a ser avaliado para envio ao pool.
+
+    try:
+        for indice, arquivo in enumerate(arquivos):
+            while proximo < len(arquivos) and len(em_andamento) < PARALELO_EM_ANDAMENTO: # Mantém o pool abastecido.
+                if no_pool[proximo]:
+                    obter_sum_dots, futuro = _enviar_ao_pool(arquivos[proximo])
+                    enviados[proximo] = (obter_sum_dots, futuro)
+                    if futuro is not None:
+                        em_andamento.append(futuro)
+                proximo += 1
+
+            if e_compactado(arquivo.filename):
+                yield from expandir_compactado(arquivo)
+            elif not no_pool[indice]:
+                yield arquivo.filename, partial(somar_dots_arquivo, arquivo.stream)
+            else:
+                obter_sum_dots, futuro = enviados.pop(indice)
+                yield arquivo.filename, obter_sum_dots
+                if futuro is not None:
+                    em_andamento.remove(futuro)
+    finally:
+        for futuro in em_andamento:
+            futuro.cancel() # Sem efeito nos que já estão em execução.
+
+def _tamanho(stream):
+    """Tamanho (em bytes) do arquivo enviado; o stream volta ao início."""
+    tamanho = stream.seek(0, io.SEEK_END)
+    stream.seek(0)
+    return tamanho
+
+def _caminho(stream):
+    """Caminho do arquivo temporário por trás do stream (ver RequisicaoConsumo), ou None se não houver."""
+    caminho = getattr(stream, "name", None) # Em um TemporaryFile sem nome, 'name' é o descritor (int).
+    return caminho if isinstance(caminho, str) and os.path.isfile(caminho) else None
+
+def _enviar_ao_pool(arquivo):
+    """
+    Envia um arquivo ao pool (se não estiver no cache). Retorna (obter_sum_dots, futuro), com
+    futuro None quando o resultado veio do cache.
+    """
+    tamanho = _tamanho(arquivo.stream)
+    with medir('hash'):
+        chave = hash_conteudo(arquivo.stream)
+    sum_dots = cache_dots.obter(chave)
+    if sum_dots is not None: # Arquivo já processado: não vai para o pool.
+        return (lambda: (chave, sum_dots, tamanho)), None
+    if tamanho >= TAMANHO_MINIMO_MMAP: # Arquivo grande: o processo do pool o abre pelo caminho (sem copiar o conteúdo).
+        arquivo.stream.flush()
+        futuro = _obter_pool().submit(somar_canais_caminho, _caminho(arquivo.stream))
+        return partial(_resultado_pool, futuro, chave, tamanho), futuro
+    with medir('leitura'):
+        conteudo = arquivo.stream.read()
+    futuro = _obter_pool().submit(somar_canais_conteudo, conteudo) # Envia o conteúdo do arquivo ao pool.
+    return partial(_resultado_pool, futuro, chave, tamanho), futuro
+
+def _resultado_pool(futuro, chave, tamanho):
+    """Aguarda o resultado de um arquivo processado no pool, normaliza as cores e o guarda no cache."""
+    with medir('extracao'):
+        sum_dots = normalizar_cores(futuro.result()) # Relança no processo principal a exceção ocorrida no pool.
+    cache_dots.guardar(chave, sum_dots)
+    return chave, sum_dots, tamanho
+
+# --- Etapas do Cálculo de Consumo ---
+def obter_config_linha(linha):
+    """Seleção e validação da linha (usando o MAPA_LINHAS)."""
+    config_linha = MAPA_LINHAS.get(linha) # Busca a configuração completa da linha usando o nome fornecido.
+    if not config_linha: # Verifica se a linha foi encontrada.
+        raise ErroConsumo("Linha de produção inválida ou não mapeada.", "linha_invalida") # Erro se a linha for desconhecida.
+    return config_linha
+
+def converter_porcentagem(porcentagem_str):
+    """Validação e conversão da porcentagem de segurança em um fator decimal (ex: "5%" -> 0.05)."""
+    try:
+        # Limpa o input (remove '%', substitui ',' por '.')
+        porcentagem_limpa = porcentagem_str.replace('%', '').replace(',', '.') # Normaliza a string para aceitar formatos como "5%" ou "5,0".
+        porcentagem = float(porcentagem_limpa) # Converte a string limpa para um número de ponto flutuante.
+    except (ValueError, TypeError, AttributeError): # Captura exceções se a string não puder ser convertida em float (ou se não foi enviada: None).
+        raise ErroConsumo("Porcentagem inválida. Use apenas números.", "porcentagem_invalida") # Erro de porcentagem inválida.
+    return porcentagem / 100.0 # Converte a porcentagem em um fator decimal (ex: 5 -> 0.05) para o cálculo final.
+
+def ler_arquivos(arquivos):
+    """
+    Gera (nome, chave, sum_dots) para cada arquivo enviado (ou membro de pacote), na ordem de envio.
+    Lança ErroConsumo no primeiro arquivo que não puder ser lido.
+    """
+    for nome_arquivo, obter_sum_dots in preparar_sum_dots(arquivos): # Inicia o loop para processar cada arquivo (em paralelo, se ativado).
+        contar('arquivos')
+        try:
+            chave, sum_dots, tamanho = obter_sum_dots() # Totais de dots por cor *deste arquivo específico* (do cache, se já lido).
+        except FormatoDesconhecidoError: # Se nenhum formato for reconhecido.
+            raise ErroConsumo(f"Formato de arquivo desconhecido para {nome_arquivo}", "formato_desconhecido")
+        contar('bytes', tamanho) # Contado aqui para todos os caminhos (sequencial, pool, cache e pacotes).
+        yield nome_arquivo, chave, sum_dots
+
+def calcular_max_dots(arquivos):
+    """
+    Processa os arquivos e retorna (max_dots, cores_unicas_na_ordem, chaves): o *máximo* de dots por
+    cor e nível entre todos os arquivos, as cores na ordem de primeira aparição e o hash de cada arquivo.
+    """
+    max_dots = {} # Dicionário que armazenará o *máximo* de dots por cor e nível entre todos os arquivos enviados.
+    cores_na_ordem = [] # Lista usada para garantir que a ordem das cores na saída seja a ordem em que foram encontradas.
+    chaves = [] # Hash do conteúdo de cada arquivo (gravado no histórico).
+    medicao = medicao_atual() # Medição da requisição (None com as métricas desativadas).
+
+    for _, chave, sum_dots in ler_arquivos(arquivos):
+        chaves.append(chave)
+        with medir('agregacao'):
+            cores_na_ordem.extend(sum_dots) # Registra as cores (na ordem em que aparecem no arquivo) para manter a ordem.
+
+            # Determina o valor máximo de dots para cada cor/nível entre todos os arquivos (global)
+            for cor_en, dots in sum_dots.items(): # Itera sobre os totais calculados no arquivo atual.
+                if cor_en not in max_dots:
+                    max_dots[cor_en] = {'l1': 0, 'l2': 0, 'l3': 0} # Inicializa a cor no dicionário global de máximos.
+
+                # Compara o total de dots do arquivo atual com o valor máximo já armazenado, atualizando se for maior.
+                max_dots[cor_en]['l1'] = max(dots['l1'], max_dots[cor_en]['l1'])
+                max_dots[cor_en]['l2'] = max(dots['l2'], max_dots[cor_en]['l2'])
+                max_dots[cor_en]['l3'] = max(dots['l3'], max_dots[cor_en]['l3'])
+
+    cores_unicas_na_ordem = list(dict.fromkeys(cores_na_ordem)) # Filtra cores repetidas, mantendo a ordem de primeira aparição.
+    if medicao is not None:
+        medicao.contar('cores', len(cores_unicas_na_ordem))
+    return max_dots, cores_unicas_na_ordem, chaves
+
+def _formatar_consumo(cores, massas_linha):
+    """Monta o JSON de uma linha a partir das massas (g) por cor, ignorando as cores sem densidade (NaN)."""
+    consumo_por_cor_lista = [] # Lista para armazenar o consumo final detalhado por cor.
+
+    for cor_en, massa_cor_g in zip(cores, massas_linha.tolist()): # Itera sobre cada cor única, na ordem de aparição.
+        if math.isnan(massa_cor_g):
+            continue # Pula a cor se a densidade não estiver mapeada (NaN), ignorando tintas desconhecidas.
+
+        cor_pt = COR_MAP_PT_BR.get(cor_en, cor_en) # Traduz a cor para o português.
+
+        consumo_por_cor_lista.append({ # Adiciona o resultado formatado à lista final.
+            "cor": cor_pt,
+            "massa_g": round(massa_cor_g, 5) # Arredonda o consumo para 5 casas decimais.
+        })
+
+    consumo_total_g = sum([item['massa_g'] for item in consumo_por_cor_lista]) # Soma o consumo de todas as cores para obter o total geral.
+
+    return { # Resultado no formato JSON devolvido ao cliente.
+        "consumo_por_cor_lista": consumo_por_cor_lista, # Consumo detalhado por cor.
+        "consumo_total_g": round(consumo_total_g, 5) # Consumo total geral.
+    }
+
+def calcular_consumo_linhas(max_dots, cores_unicas_na_ordem, fator_porcentagem, linhas=None):
+    """
+    Cálculo do consumo final (em gramas) para várias linhas (todas, por padrão) em uma única operação.
+    Retorna {linha: resultado no formato JSON devolvido pela API}.
+    """
+    with medir('calculo'):
+        linhas, cores, massas = motor_consumo.calcular_massas(max_dots, cores_unicas_na_ordem, fator_porcentagem, linhas)
+        resultados = {linha: _formatar_consumo(cores, massas[indice]) for indice, linha in enumerate(linhas)}
+
+    medicao = medicao_atual()
+    if medicao is not None: # Cores ignoradas por falta de densidade em todas as linhas calculadas (uma vez por requisição).
+        com_densidade = sum(1 for coluna in zip(*massas.tolist()) if not all(math.isnan(massa) for massa in coluna))
+        medicao.contar('cores_sem_densidade', len(cores_unicas_na_ordem) - com_densidade)
+    return resultados
+
+def calcular_consumo(max_dots, cores_unicas_na_ordem, linha, fator_porcentagem):
+    """Cálculo do consumo final (em gramas) por cor e total para uma linha, no formato JSON devolvido pela API."""
+    return calcular_consumo_linhas(max_dots, cores_unicas_na_ordem, fator_porcentagem, [linha])[linha]
+
+def processar_upload(arquivos, linha, porcentagem_str):
+    """Executa todas as etapas do cálculo para um upload. Lança ErroConsumo em caso de erro."""
+    obter_config_linha(linha) # 2. Seleção e Validação da Linha.
+    fator_porcentagem = converter_porcentagem(porcentagem_str) # 3. Validação e Conversão da Porcentagem.
+    max_dots, cores_unicas_na_ordem, chaves = calcular_max_dots(arquivos) # 4. Processamento dos Arquivos.
+    resultado = calcular_consumo(max_dots, cores_unicas_na_ordem, linha, fator_porcentagem) # 5. Cálculo do Consumo Final.
+    registrar_historico(linha, fator_porcentagem, chaves, resultado) # 6. Gravação no histórico (em segundo plano).
+    return resultado
+
+def _tratar_erro_job(erro):
+    """Converte a exceção de um job no mesmo JSON de erro devolvido por '/upload-multi'."""
+    if isinstance(erro, ErroConsumo):
+        return {"error": erro.mensagem}
+    app.logger.exception("Erro ao processar job", exc_info=erro)
+    return {"error": "Erro interno ao processar os arquivos."}
+
+def copiar_arquivos(arquivos):
+    """
+    Copia os arquivos enviados para arquivos temporários (em memória até 1 MB), pois os streams
+    da requisição são fechados quando a resposta é enviada. No modo paralelo, os grandes ganham um
+    nome no disco, para serem abertos pelo pool.
+    """
+    copias = []
+    for arquivo in arquivos:
+        if _gravar_com_nome(_tamanho(arquivo.stream)):
+            copia = tempfile.NamedTemporaryFile("w+b", prefix="consumo-")
+        else:
+            copia = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        arquivo.stream.seek(0)
+        shutil.copyfileobj(arquivo.stream, copia)
+        copia.seek(0)
+        copias.append(FileStorage(stream=copia, filename=arquivo.filename))
+    return copias
+
+# --- Métricas ---
+# Rotas cujas requisições são medidas (cabeçalho 'Server-Timing' e '/metrics'); CONSUMO_METRICAS=0 desativa.
+ENDPOINTS_MEDIDOS = {'upload_files', 'upload_files_todas_linhas', 'criar_sessao', 'adicionar_arquivos', 'calcular_sessao'}
+
+# --- Sessões de Upload (Recálculo Incremental) ---
+# Configurável por variáveis de ambiente: TTL sem acesso, número máximo de sessões e memória total estimada.
+sessoes = GerenciadorSessoes(
+    ttl_segundos=int(os.environ.get("CONSUMO_SESSOES_TTL_SEGUNDOS", 3600)),
+    max_sessoes=int(os.environ.get("CONSUMO_SESSOES_MAX", 100)),
+    max_bytes=int(os.environ.get("CONSUMO_SESSOES_MAX_BYTES", 64 * 1024 * 1024))
+)
+
+def obter_sessao(id_sessao):
+    """Retorna a sessão ou lança ErroConsumo (HTTP 404) se ela não existir ou tiver expirado."""
+    try:
+        return sessoes.obter(id_sessao)
+    except SessaoInexistenteError:
+        raise ErroConsumo("Sessão não encontrada ou expirada.", "sessao_inexistente", 404)
+
+def adicionar_arquivos_sessao(sessao, arquivos):
+    """
+    Lê os arquivos enviados (com cache e pacotes .zip/.tar.gz) e os inclui na sessão. Nada é incluído
+    se algum arquivo falhar. Retorna o resumo da sessão.
+    """
+    lidos = list(ler_arquivos(arquivos)) # Lê todos antes de alterar a sessão.
+    try:
+        sessoes.adicionar_arquivos(sessao, lidos)
+    except LimiteSessaoError:
+        raise ErroConsumo("Limite de memória da sessão excedido. Crie uma nova sessão.", "sessao_limite", 413)
+    except SessaoInexistenteError: # A sessão foi descartada (limites ou TTL) enquanto os arquivos eram lidos.
+        raise ErroConsumo("Sessão não encontrada ou expirada.", "sessao_inexistente", 404)
+    return sessao.resumo()
+
+# --- Fila de Jobs (Cálculos Assíncronos) ---
+# Configurável por variáveis de ambiente: tamanho da fila, jobs simultâneos e TTL dos resultados.
+fila_jobs = FilaJobs(
+    max_pendentes=int(os.environ.get("CONSUMO_JOBS_MAX_PENDENTES", 32)), # Jobs aguardando execução (backpressure).
+    max_simultaneos=int(os.environ.get("CONSUMO_JOBS_MAX_SIMULTANEOS", 2)), # Jobs executados ao mesmo tempo.
+    ttl_segundos=int(os.environ.get("CONSUMO_JOBS_TTL_SEGUNDOS", 600)), # Tempo que um resultado fica disponível.
+    tratar_erro=_tratar_erro_job
+)
+
+def rotular_medicao(linha):
+    """Define a linha (rótulo do histograma de latência) da medição da requisição atual."""
+    medicao = medicao_atual()
+    if medicao is not None:
+        medicao.linha = linha if linha in MAPA_LINHAS or linha == "todas" else "invalida" # Evita rótulos arbitrários.
+
 # --- Rotas da Aplicação ---
+@app.errorhandler(ErroConsumo) # Converte os erros de validação/leitura na resposta JSON de erro.
+def tratar_erro_consumo(erro):
+    contar('erros', rotulo=erro.motivo)
+    return jsonify({"error": erro.mensagem}), erro.status
+
+@app.before_request
+def iniciar_medicao_requisicao():
+    """Inicia a medição das rotas de cálculo (nada é feito com as métricas desativadas)."""
+    if request.endpoint in ENDPOINTS_MEDIDOS:
+        g.medicao, g.token_medicao = iniciar_medicao()
+
+@app.after_request
+def encerrar_medicao_requisicao(resposta):
+    """Adiciona o cabeçalho 'Server-Timing' e soma a medição da requisição ao registro de métricas."""
+    medicao = g.get('medicao')
+    if medicao is not None:
+        resposta.headers['Server-Timing'] = medicao.server_timing()
+        registro_metricas.registrar(medicao, medicao.duracao())
+    return resposta
+
+@app.teardown_request
+def liberar_medicao_requisicao(erro=None):
+    """Desassocia a medição do contexto, mesmo quando a requisição termina com erro inesperado."""
+    if g.get('medicao') is not None:
+        encerrar_medicao(g.pop('token_medicao'))
+        g.pop('medicao')
+
+@app.route('/metrics', methods=['GET']) # Métricas no formato texto do Prometheus.
+def metrics():
+    """Exporta latências, tempos por etapa, contadores e o estado do cache e da fila de jobs."""
+    if not METRICAS_ATIVADAS:
+        return jsonify({"error": "Métricas desativadas."}), 404
+    cache = cache_dots.estatisticas()
+    jobs = fila_jobs.estatisticas()
+    estado_sessoes = sessoes.estatisticas()
+    extras = [
+        ("cache_hits_total", "counter", "Arquivos atendidos pelo cache.", cache["hits"]),
+        ("cache_misses_total", "counter", "Arquivos lidos por não estarem no cache.", cache["misses"]),
+        ("cache_evictions_total", "counter", "Entradas removidas do cache.", cache["evictions"]),
+        ("cache_entradas", "gauge", "Entradas atualmente no cache.", cache["entradas"]),
+        ("cache_bytes", "gauge", "Tamanho estimado do cache (bytes).", cache["bytes"]),
+        ("jobs_fila", "gauge", "Jobs aguardando na fila.", jobs["fila"]),
+        ("jobs_executando", "gauge", "Jobs em execução.", jobs["executando"]),
+        ("sessoes", "gauge", "Sessões de upload ativas.", estado_sessoes["sessoes"]),
+        ("sessoes_bytes", "gauge", "Memória estimada das sessões (bytes).", estado_sessoes["bytes"]),
+        ("sessoes_evictions_total", "counter", "Sessões descartadas por limite.", estado_sessoes["evictions"]),
+    ]
+    if historico is not None:
+        extras.append(("historico_descartados_total", "counter", "Resultados não gravados no histórico (fila cheia ou falha de gravação).", historico.descartados))
+    return registro_metricas.exportar(extras=extras), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/') # Decorador que mapeia a URL raiz ('/') para a função 'home'.
 def home(): # Função que define a resposta para a rota raiz.
     """Rota inicial que renderiza a interface HTML."""
@@ -168,126 +680,181 @@ def home(): # Função que define a resposta para a rota raiz.
 def upload_files(): # Função que executa a lógica de processamento e cálculo.
     """
     Processa o upload de múltiplos arquivos RIP, calcula o consumo de tinta em gramas.
+    Pacotes .zip/.tar.gz enviados em 'files[]' são lidos membro a membro, como arquivos avulsos.
     """
-    
+
     # 1. Validação de Arquivo e Parâmetros
     if 'files[]' not in request.files or not request.files.getlist('files[]'): # Verifica se a lista de arquivos está vazia.
-        return jsonify({"error": "Nenhum arquivo enviado"}), 400 # Retorna um erro JSON com status HTTP 400.
+        raise ErroConsumo("Nenhum arquivo enviado", "sem_arquivos") # Retorna um erro JSON com status HTTP 400.
 
     arquivos = request.files.getlist('files[]') # Obtém a lista de objetos FileStorage dos arquivos enviados.
     porcentagem_str = request.form.get('porcentagem') # Obtém a string da porcentagem de segurança do formulário.
     linha = request.form.get('linha') # Obtém o nome da linha de produção selecionada.
+    rotular_medicao(linha)
 
-    # 2. Seleção e Validação da Linha (Usando o MAPA_LINHAS)
-    config_linha = MAPA_LINHAS.get(linha) # Busca a configuração completa da linha usando o nome fornecido.
-    if not config_linha: # Verifica se a linha foi encontrada.
-        return jsonify({"error": "Linha de produção inválida ou não mapeada."}), 400 # Retorna erro se a linha for desconhecida.
-    
-    densidades = config_linha["densidades"] # Atribui o dicionário de densidades da linha à variável local 'densidades'.
-    gotas = config_linha["gotas"] # Atribui o dicionário de gotas da linha à variável local 'gotas'.
-    tipo_gotas = config_linha["tipo_gotas"] # Atribui a regra de cálculo ("nivel" ou "cor").
+    return jsonify(processar_upload(arquivos, linha, porcentagem_str)), 200 # Retorna o resultado com status HTTP 200 (OK).
+
+@app.route('/upload-multi/linhas', methods=['POST']) # Mesmo cálculo de '/upload-multi', para todas as linhas de uma vez.
+def upload_files_todas_linhas():
+    """
+    Processa os arquivos uma única vez e retorna o consumo em todas as linhas do MAPA_LINHAS
+    (ou apenas nas linhas enviadas em 'linhas[]'), no formato {"linhas": {linha: resultado}}.
+    """
+    if 'files[]' not in request.files or not request.files.getlist('files[]'): # Verifica se a lista de arquivos está vazia.
+        raise ErroConsumo("Nenhum arquivo enviado", "sem_arquivos")
+
+    linhas = request.form.getlist('linhas[]') or None # Linhas a comparar (padrão: todas).
+    rotular_medicao("todas")
+    for linha in linhas or []:
+        obter_config_linha(linha) # Valida cada linha pedida.
+    fator_porcentagem = converter_porcentagem(request.form.get('porcentagem'))
+
+    max_dots, cores_unicas_na_ordem, _ = calcular_max_dots(request.files.getlist('files[]'))
+    return jsonify({"linhas": calcular_consumo_linhas(max_dots, cores_unicas_na_ordem, fator_porcentagem, linhas)}), 200
+
+@app.route('/jobs', methods=['POST']) # Versão assíncrona de '/upload-multi', para lotes grandes.
+def criar_job():
+    """
+    Recebe os mesmos campos de '/upload-multi' ('files[]', 'linha', 'porcentagem') e enfileira o cálculo.
+    Retorna imediatamente o id do job (HTTP 202); o resultado é consultado em '/jobs/<id>'.
+    """
+    if 'files[]' not in request.files or not request.files.getlist('files[]'): # Verifica se a lista de arquivos está vazia.
+        raise ErroConsumo("Nenhum arquivo enviado", "sem_arquivos")
+
+    porcentagem_str = request.form.get('porcentagem')
+    linha = request.form.get('linha')
+    obter_config_linha(linha) # Valida a linha e a porcentagem antes de enfileirar, devolvendo o erro imediatamente.
+    converter_porcentagem(porcentagem_str)
+
+    arquivos = copiar_arquivos(request.files.getlist('files[]')) # Cópias que sobrevivem ao fim da requisição.
+
+    def liberar_arquivos():
+        for arquivo in arquivos:
+            arquivo.close()
 
-    # 3. Validação e Conversão da Porcentagem
     try:
-        # Limpa o input (remove '%', substitui ',' por '.')
-        porcentagem_limpa = porcentagem_str.replace('%', '').replace(',', '.') # Normaliza a string para aceitar formatos como "5%" ou "5,0".
-        porcentagem = float(porcentagem_limpa) # Converte a string limpa para um número de ponto flutuante.
-        fator_porcentagem = porcentagem / 100.0 # Converte a porcentagem em um fator decimal (ex: 5 -> 0.05) para o cálculo final.
-    except (ValueError, TypeError): # Captura exceções se a string não puder ser convertida em float.
-        return jsonify({"error": "Porcentagem inválida. Use apenas números."}), 400 # Retorna erro de porcentagem inválida.
+        id_job = fila_jobs.enviar(partial(processar_upload, arquivos, linha, porcentagem_str), ao_finalizar=liberar_arquivos)
+    except FilaCheiaError:
+        liberar_arquivos()
+        resposta = jsonify({"error": "Servidor ocupado. Tente novamente em instantes."})
+        resposta.headers['Retry-After'] = '5'
+        return resposta, 503 # Backpressure: o cliente deve reenviar mais tarde.
 
-    # 4. Processamento dos Arquivos
-    max_dots = {} # Dicionário que armazenará o *máximo* de dots por cor e nível entre todos os arquivos enviados.
-    cores_na_ordem = [] # Lista usada para garantir que a ordem das cores na saída seja a ordem em que foram encontradas.
+    resposta = jsonify({"id": id_job, "status": PENDENTE})
+    resposta.headers['Location'] = url_for('consultar_job', id_job=id_job)
+    return resposta, 202
+
+@app.route('/jobs/<id_job>', methods=['GET'])
+def consultar_job(id_job):
+    """
+    Retorna o status do job; quando finalizado, 'resultado' contém o mesmo JSON de '/upload-multi'
+    (ou {"error": ...} quando o status é "erro").
+    """
+    job = fila_jobs.consultar(id_job)
+    if job is None:
+        return jsonify({"error": "Job não encontrado ou expirado."}), 404
+    return jsonify({"id": job["id"], "status": job["status"], "resultado": job["resultado"]}), 200
 
-    for arquivo in arquivos: # Inicia o loop para processar cada arquivo.
+@app.route('/sessoes', methods=['POST']) # Cria uma sessão com os arquivos enviados em 'files[]'.
+def criar_sessao():
+    """
+    Lê os arquivos uma única vez e guarda seus totais de dots. Retorna o id da sessão e dos arquivos;
+    depois, '/sessoes/<id>/calcular' aceita qualquer linha e porcentagem sem reenviar os arquivos.
+    """
+    if 'files[]' not in request.files or not request.files.getlist('files[]'): # Verifica se a lista de arquivos está vazia.
+        raise ErroConsumo("Nenhum arquivo enviado", "sem_arquivos")
+
+    sessao = sessoes.criar()
+    try:
+        resumo = adicionar_arquivos_sessao(sessao, request.files.getlist('files[]'))
+    except ErroConsumo:
         try:
-            arquivo.stream.seek(0) # Reposiciona o ponteiro de leitura para o início do arquivo.
-            conteudo_arquivo = arquivo.stream.read().decode("utf-8") # Lê e decodifica o conteúdo do arquivo como texto.
-        except UnicodeDecodeError:
-            return jsonify({"error": f"Erro ao ler o arquivo {arquivo.filename}. Verifique a codificação."}), 400 # Trata erro de codificação.
-        
-        sum_dots = {} # Dicionário temporário para acumular dots por cor *deste arquivo específico*.
-        
-        # Expressões regulares para diferentes formatos de arquivo RIP
-        canais_rip1 = re.findall(r'Color=(\w+).*?Dots_Level_1=(\d+).*?Dots_Level_2=(\d+).*?Dots_Level_3=(\d+)', conteudo_arquivo, re.DOTALL) # Tenta extrair dados no Formato 1 (Color=... Dots_Level_X=...).
-        canais_rip2 = re.findall(r'tif_(\w+)\s*=\s*(\d+),(\d+),(\d+)', conteudo_arquivo) # Tenta extrair dados no Formato 2 (tif_cor=d1,d2,d3).
-
-        if canais_rip1: # Se o Formato 1 for encontrado.
-            dados_arquivo = canais_rip1
-        elif canais_rip2: # Se o Formato 2 for encontrado.
-            dados_arquivo = canais_rip2
-        else: # Se nenhum formato for reconhecido.
-            return jsonify({"error": f"Formato de arquivo desconhecido para {arquivo.filename}"}), 400 # Retorna erro.
-
-        # Acumula a contagem de dots por cor e nível (dentro deste arquivo)
-        for cor_en, dots_l1, dots_l2, dots_l3 in dados_arquivo: # Itera sobre os resultados da Regex.
-            cor_en = COR_MAP_ERROS.get(cor_en.upper(), cor_en.capitalize()) # Corrige e normaliza o nome da cor.
-            cores_na_ordem.append(cor_en) # Registra a cor para manter a ordem.
-            dots_l1 = int(dots_l1) # Converte o Nível 1 para inteiro.
-            dots_l2 = int(dots_l2) # Converte o Nível 2 para inteiro.
-            dots_l3 = int(dots_l3) # Converte o Nível 3 para inteiro.
-            
-            if cor_en not in sum_dots:
-                sum_dots[cor_en] = {'l1': 0, 'l2': 0, 'l3': 0} # Inicializa a contagem se for a primeira vez.
-            
-            sum_dots[cor_en]['l1'] += dots_l1 # Acumula dots do Nível 1.
-            sum_dots[cor_en]['l2'] += dots_l2 # Acumula dots do Nível 2.
-            sum_dots[cor_en]['l3'] += dots_l3 # Acumula dots do Nível 3.
-
-        # Determina o valor máximo de dots para cada cor/nível entre todos os arquivos (global)
-        for cor_en, dots in sum_dots.items(): # Itera sobre os totais calculados no arquivo atual.
-            if cor_en not in max_dots:
-                max_dots[cor_en] = {'l1': 0, 'l2': 0, 'l3': 0} # Inicializa a cor no dicionário global de máximos.
-            
-            # Compara o total de dots do arquivo atual com o valor máximo já armazenado, atualizando se for maior.
-            max_dots[cor_en]['l1'] = max(dots['l1'], max_dots[cor_en]['l1'])
-            max_dots[cor_en]['l2'] = max(dots['l2'], max_dots[cor_en]['l2'])
-            max_dots[cor_en]['l3'] = max(dots['l3'], max_dots[cor_en]['l3'])
-
-    # 5. Cálculo do Consumo Final
-    consumo_por_cor_lista = [] # Lista para armazenar o consumo final detalhado por cor.
-    cores_unicas_na_ordem = list(dict.fromkeys(cores_na_ordem)) # Filtra cores repetidas, mantendo a ordem de primeira aparição.
+            sessoes.excluir(sessao.id) # Não deixa uma sessão vazia para trás.
+        except SessaoInexistenteError:
+            pass # A sessão já foi descartada (limite de sessões ou de memória).
+        raise
+    return jsonify(resumo), 201
 
-    for cor_en in cores_unicas_na_ordem: # Itera sobre cada cor única a ser calculada.
-        dots = max_dots.get(cor_en) # Obtém o dicionário de dots máximos (l1, l2, l3) para a cor.
-        if dots:
-            densidade_cor = densidades.get(cor_en) # Obtém a densidade da tinta da linha selecionada.
-            
-            if densidade_cor is None:
-                continue # Pula a cor se a densidade não estiver mapeada (ignorando tintas desconhecidas).
-
-            volume_cor_pl = 0 # Inicializa o volume total em picolitros.
-            
-            # Lógica de Volume de Tinta Consolidada (usa a regra definida em 'tipo_gotas')
-            if tipo_gotas == "nivel": # Regra para linhas como TRIMS, LINHA1_2, LINHA3.
-                # O volume total é a soma do produto (dots de um nível * pL específico daquele nível).
-                volume_cor_pl = (dots['l1'] * gotas[1]) + \
-                                (dots['l2'] * gotas[2]) + \
-                                (dots['l3'] * gotas[3])
-            
-            elif tipo_gotas == "cor": # Regra para linhas como LINHA4, IAC.
-                # O volume total é a soma total de dots (l1+l2+l3) multiplicada pelo pL fixo da cor.
-                total_dots = dots['l1'] + dots['l2'] + dots['l3'] # Soma todos os dots.
-                gotas_cor = gotas.get(cor_en, 0) # Obtém o volume da gota (pL) para a cor específica.
-                volume_cor_pl = total_dots * gotas_cor # Volume total.
-            
-            # 6. Conversão e Cálculo Final (Gramas)
-            volume_cor_ml = volume_cor_pl * 1e-9 # Converte picolitros (pL, 1e-12 L) para mililitros (mL, 1e-3 L) -> 1e-9.
-            
-            # Massa (g) = Volume (mL) * Densidade (g/mL) * Fator de Segurança (1 + fator_porcentagem)
-            massa_cor_g = (volume_cor_ml * densidade_cor) * (1 + fator_porcentagem) # Aplica a fórmula de massa e o fator de segurança.
-            
-            cor_pt = COR_MAP_PT_BR.get(cor_en, cor_en) # Traduz a cor para o português.
-            
-            consumo_por_cor_lista.append({ # Adiciona o resultado formatado à lista final.
-                "cor": cor_pt,
-                "massa_g": round(massa_cor_g, 5) # Arredonda o consumo para 5 casas decimais.
-            })
-            
-    consumo_total_g = sum([item['massa_g'] for item in consumo_por_cor_lista]) # Soma o consumo de todas as cores para obter o total geral.
+@app.route('/sessoes/<id_sessao>', methods=['GET'])
+def consultar_sessao(id_sessao):
+    """Lista os arquivos (id e nome) e as cores da sessão."""
+    return jsonify(obter_sessao(id_sessao).resumo()), 200
 
-    return jsonify({ # Retorna a resposta ao cliente no formato JSON.
-        "consumo_por_cor_lista": consumo_por_cor_lista, # Consumo detalhado por cor.
-        "consumo_total_g": round(consumo_total_g, 5) # Consumo total geral.
-    }), 200 # Retorna o status HTTP 200 (OK).
+@app.route('/sessoes/<id_sessao>', methods=['DELETE'])
+def excluir_sessao(id_sessao):
+    """Exclui a sessão e libera a memória dos seus arquivos."""
+    try:
+        sessoes.excluir(id_sessao)
+    except SessaoInexistenteError:
+        raise ErroConsumo("Sessão não encontrada ou expirada.", "sessao_inexistente", 404)
+    return '', 204
+
+@app.route('/sessoes/<id_sessao>/arquivos', methods=['POST']) # Inclui mais arquivos em uma sessão existente.
+def adicionar_arquivos(id_sessao):
+    """Lê os arquivos enviados em 'files[]' e os inclui na sessão. Retorna o resumo da sessão."""
+    sessao = obter_sessao(id_sessao)
+    if 'files[]' not in request.files or not request.files.getlist('files[]'):
+        raise ErroConsumo("Nenhum arquivo enviado", "sem_arquivos")
+    return jsonify(adicionar_arquivos_sessao(sessao, request.files.getlist('files[]'))), 200
+
+@app.route('/sessoes/<id_sessao>/arquivos/<id_arquivo>', methods=['DELETE']) # Remove um arquivo da sessão.
+def remover_arquivo(id_sessao, id_arquivo):
+    """Remove um arquivo da sessão, recalculando só as cores afetadas. Retorna o resumo da sessão."""
+    sessao = obter_sessao(id_sessao)
+    try:
+        sessoes.remover_arquivo(sessao, id_arquivo)
+    except SessaoInexistenteError as erro:
+        if erro.args[0] == sessao.id: # A sessão foi descartada depois de obtida.
+            raise ErroConsumo("Sessão não encontrada ou expirada.", "sessao_inexistente", 404)
+        raise ErroConsumo("Arquivo não encontrado na sessão.", "sessao_inexistente", 404)
+    return jsonify(sessao.resumo()), 200
+
+@app.route('/sessoes/<id_sessao>/calcular', methods=['POST'])
+def calcular_sessao(id_sessao):
+    """
+    Recalcula o consumo dos arquivos da sessão com a 'linha' e a 'porcentagem' enviadas, sem ler
+    nenhum arquivo. Retorna o mesmo JSON de '/upload-multi'.
+    """
+    sessao = obter_sessao(id_sessao)
+    linha = request.form.get('linha')
+    rotular_medicao(linha)
+    obter_config_linha(linha)
+    fator_porcentagem = converter_porcentagem(request.form.get('porcentagem'))
+
+    with sessao.trava:
+        if not sessao.arquivos:
+            raise ErroConsumo("Nenhum arquivo na sessão", "sem_arquivos")
+        max_dots = {cor_en: dict(dots) for cor_en, dots in sessao.max_dots.items()} # Cópia: a sessão pode mudar depois.
+        cores_unicas_na_ordem = list(sessao.cores_na_ordem)
+        chaves = sessao.chaves()
+
+    resultado = calcular_consumo(max_dots, cores_unicas_na_ordem, linha, fator_porcentagem)
+    registrar_historico(linha, fator_porcentagem, chaves, resultado)
+    return jsonify(resultado), 200
+
+def _data_consulta(nome):
+    """Lê o parâmetro de data (AAAA-MM-DD) da consulta ao histórico. Lança ErroConsumo se for inválido."""
+    valor = request.args.get(nome)
+    if not valor:
+        return None
+    try:
+        return datetime.date.fromisoformat(valor).isoformat()
+    except ValueError:
+        raise ErroConsumo(f"Data inválida em '{nome}' (use AAAA-MM-DD).", "data_invalida")
+
+@app.route('/historico/totais', methods=['GET'])
+def historico_totais():
+    """
+    Totais e médias de consumo (g) do histórico. Parâmetros (todos opcionais): 'inicio' e 'fim'
+    (AAAA-MM-DD, inclusivos), 'linha' e 'cor' (repetíveis) e 'agrupar' (lista de 'dia', 'linha', 'cor',
+    separados por vírgula; padrão 'linha,cor').
+    """
+    if historico is None:
+        return jsonify({"error": "Histórico desativado."}), 404
+    inicio, fim = _data_consulta('inicio'), _data_consulta('fim')
+    agrupar_por = [coluna for coluna in request.args.get('agrupar', 'linha,cor').split(',') if coluna]
+    if any(coluna not in AGRUPAMENTOS for coluna in agrupar_por):
+        raise ErroConsumo(f"Agrupamento inválido (use {', '.join(AGRUPAMENTOS)}).", "agrupamento_invalido")
+
+    totais = historico.totais(inicio, fim, request.args.getlist('linha'), request.args.getlist('cor'), agrupar_por)
+    return jsonify({"inicio": inicio, "fim": fim, "agrupar_por": agrupar_por, "totais": totais}), 200
@@ -0,0 +1,8 @@
+"""
+Benchmark do cálculo de consumo (rota '/upload-multi').
+
+Uso (a partir da raiz do projeto):
+    python -m benchmark --saida baseline.json           # mede e grava a linha de base
+    python -m benchmark --comparar baseline.json        # mede e falha se houver regressão
+    python -m benchmark --historico                     # inclui a latência das consultas ao histórico
+"""
@@ -0,0 +1,39 @@
+import argparse # Importa o módulo 'argparse', usado para ler as opções da linha de comando.
+import sys # Importa o módulo 'sys', usado para devolver o código de saída (1 = regressão).
+
+from benchmark.executar import CENARIOS, CENARIOS_RAPIDOS, comparar, executar, gravar, ler
+from benchmark.historico import TAMANHOS, TAMANHOS_RAPIDOS, medir_historico
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Benchmark da rota /upload-multi.")
+    parser.add_argument("--saida", help="grava o resultado (JSON) neste arquivo, para uso como linha de base")
+    parser.add_argument("--comparar", metavar="BASE", help="compara com a linha de base e falha se houver regressão")
+    parser.add_argument("--limite", type=float, default=0.2, help="piora máxima aceita por métrica (padrão: 0.2 = 20%%)")
+    parser.add_argument("--repeticoes", type=int, default=5, help="requisições medidas por cenário (padrão: 5)")
+    parser.add_argument("--rapido", action="store_true", help="executa apenas os cenários pequenos")
+    parser.add_argument("--com-cache", action="store_true", help="mantém o cache de arquivos entre as repetições")
+    parser.add_argument("--historico", action="store_true", help="mede também as consultas ao histórico com 10k, 100k e 1M registros")
+    args = parser.parse_args(argv)
+
+    resultado = executar(CENARIOS_RAPIDOS if args.rapido else CENARIOS, args.repeticoes, args.com_cache)
+    if args.historico:
+        resultado["cenarios"].update(medir_historico(TAMANHOS_RAPIDOS if args.rapido else TAMANHOS))
+
+    if args.saida:
+        gravar(resultado, args.saida)
+        print(f"Resultado gravado em {args.saida}")
+
+    if args.comparar:
+        regressoes = comparar(resultado, ler(args.comparar), args.limite)
+        if regressoes:
+            print("Regressões de desempenho:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            return 1
+        print(f"Sem regressões acima de {args.limite:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
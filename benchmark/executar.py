@@ -0,0 +1,155 @@
+import io # Importa o módulo 'io', usado para enviar os arquivos gerados como streams.
+import json # Importa o módulo 'json', usado para gravar e ler a linha de base.
+import os # Importa o módulo 'os', usado para desativar o histórico da aplicação durante as medições.
+import platform # Importa o módulo 'platform', usado para registrar o ambiente da medição.
+import time # Importa o módulo 'time', usado para medir a latência de cada requisição.
+import tracemalloc # Importa o módulo 'tracemalloc', usado para medir o pico de memória.
+
+os.environ.setdefault("CONSUMO_HISTORICO_DB", "") # As requisições medidas não devem ser gravadas no histórico real.
+
+from app import app, cache_dots # Aplicação Flask e cache de arquivos (limpo antes de cada requisição).
+from benchmark.gerador import escolher_cores, gerar_arquivo, gerar_arquivo_adversario
+
+# --- Execução do Benchmark ---
+# Cada cenário envia um lote de arquivos sintéticos para '/upload-multi' pelo cliente de testes
+# do Flask e mede latência (p50/p99), vazão e pico de memória.
+
+KB = 1024
+MB = 1024 * KB
+
+# Cenários padrão: (nome, formato, tamanho de cada arquivo, número de arquivos, número de cores, cores com erros).
+CENARIOS = [
+    ("f1-pequeno", 1, 16 * KB, 1, 9, False),
+    ("f2-pequeno", 2, 16 * KB, 1, 9, False),
+    ("f1-grande", 1, 8 * MB, 1, 9, False),
+    ("f2-grande", 2, 8 * MB, 1, 9, False),
+    ("f1-lote-50", 1, 256 * KB, 50, 9, True),
+    ("f2-lote-50", 2, 256 * KB, 50, 9, True),
+    ("f1-poucas-cores", 1, 1 * MB, 10, 3, False),
+    ("f1-cores-com-erros", 1, 1 * MB, 10, 19, True),
+    ("adversario", "adversario", 256 * KB, 1, 1, False),
+]
+
+# Cenários reduzidos (--rapido), para uma verificação rápida.
+CENARIOS_RAPIDOS = [
+    ("f1-pequeno", 1, 16 * KB, 1, 9, False),
+    ("f2-pequeno", 2, 16 * KB, 1, 9, False),
+    ("f1-lote-10", 1, 64 * KB, 10, 9, True),
+    ("adversario", "adversario", 32 * KB, 1, 1, False),
+]
+
+# Métricas comparadas e o sentido da regressão (+1: maior é pior; -1: menor é pior).
+METRICAS_COMPARADAS = {"p50_ms": 1, "p99_ms": 1, "mb_por_s": -1, "pico_memoria_mb": 1}
+
+
+def gerar_lote(formato, tamanho_bytes, num_arquivos, num_cores, com_erros):
+    """Gera a lista (nome, conteúdo) dos arquivos de um cenário."""
+    arquivos = []
+    for indice in range(num_arquivos):
+        if formato == "adversario":
+            conteudo = gerar_arquivo_adversario(tamanho_bytes, semente=indice)
+        else:
+            cores = escolher_cores(num_cores, com_erros, semente=indice)
+            conteudo = gerar_arquivo(formato, cores, tamanho_bytes, semente=indice)
+        arquivos.append((f"arquivo_{indice}.dat", conteudo))
+    return arquivos
+
+
+def _enviar(cliente, arquivos, linha="TRIMS", porcentagem="30"):
+    dados = {
+        "files[]": [(io.BytesIO(conteudo), nome) for nome, conteudo in arquivos],
+        "linha": linha,
+        "porcentagem": porcentagem,
+    }
+    resposta = cliente.post("/upload-multi", data=dados, content_type="multipart/form-data")
+    if resposta.status_code != 200:
+        raise RuntimeError(f"Resposta inesperada ({resposta.status_code}): {resposta.get_json()}")
+
+
+def _percentil(valores, percentil):
+    """Percentil pelo método do posto mais próximo (valores já ordenados)."""
+    indice = max(int(round(percentil / 100.0 * len(valores) + 0.5)) - 1, 0)
+    return valores[min(indice, len(valores) - 1)]
+
+
+def medir_cenario(cliente, arquivos, repeticoes, usar_cache=False):
+    """Executa o cenário 'repeticoes' vezes e retorna as métricas."""
+    total_bytes = sum(len(conteudo) for _, conteudo in arquivos)
+    _enviar(cliente, arquivos) # Aquecimento (e validação da resposta).
+
+    latencias = []
+    for _ in range(repeticoes):
+        if not usar_cache:
+            cache_dots.limpar() # Mede a leitura completa dos arquivos, não o cache.
+        inicio = time.perf_counter()
+        _enviar(cliente, arquivos)
+        latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+
+    # O pico de memória é medido em uma execução separada, pois o tracemalloc distorce os tempos.
+    cache_dots.limpar()
+    tracemalloc.start()
+    _enviar(cliente, arquivos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tempo_total = sum(latencias)
+    return {
+        "arquivos": len(arquivos),
+        "bytes": total_bytes,
+        "repeticoes": repeticoes,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p99_ms": _percentil(latencias, 99) * 1000,
+        "arquivos_por_s": len(arquivos) * repeticoes / tempo_total,
+        "mb_por_s": total_bytes * repeticoes / tempo_total / MB,
+        "pico_memoria_mb": pico / MB,
+    }
+
+
+def executar(cenarios=CENARIOS, repeticoes=5, usar_cache=False, log=print):
+    """Executa todos os cenários e retorna o resultado no formato da linha de base."""
+    cliente = app.test_client()
+    resultados = {}
+    for nome, formato, tamanho_bytes, num_arquivos, num_cores, com_erros in cenarios:
+        arquivos = gerar_lote(formato, tamanho_bytes, num_arquivos, num_cores, com_erros)
+        resultados[nome] = medir_cenario(cliente, arquivos, repeticoes, usar_cache)
+        metricas = resultados[nome]
+        log(f"{nome:<22} p50={metricas['p50_ms']:9.2f} ms  p99={metricas['p99_ms']:9.2f} ms  "
+            f"{metricas['mb_por_s']:8.2f} MB/s  pico={metricas['pico_memoria_mb']:7.2f} MB")
+    return {
+        "versao": 1,
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform()},
+        "cenarios": resultados,
+    }
+
+
+def comparar(atual, base, limite):
+    """
+    Compara duas medições e retorna a lista de regressões (mensagens). Uma métrica regride quando
+    piora mais que 'limite' (fração, ex: 0.2 = 20%) em relação à linha de base.
+    """
+    regressoes = []
+    for nome, metricas_base in base["cenarios"].items():
+        metricas_atuais = atual["cenarios"].get(nome)
+        if metricas_atuais is None:
+            continue # Cenário não executado nesta medição.
+        for metrica, sentido in METRICAS_COMPARADAS.items():
+            if metrica not in metricas_base or metrica not in metricas_atuais:
+                continue # Métrica não medida neste cenário (ex: memória nos cenários do histórico).
+            valor_base, valor_atual = metricas_base[metrica], metricas_atuais[metrica]
+            if valor_base <= 0:
+                continue
+            variacao = (valor_atual - valor_base) / valor_base * sentido # Positivo = pior.
+            if variacao > limite:
+                regressoes.append(f"{nome}: {metrica} {valor_base:.2f} -> {valor_atual:.2f} ({variacao:+.0%} pior)")
+    return regressoes
+
+
+def gravar(resultado, caminho):
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, indent=2, sort_keys=True)
+
+
+def ler(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
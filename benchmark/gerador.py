@@ -0,0 +1,66 @@
+import random # Importa o módulo 'random', usado para gerar contagens de dots e escolher cores.
+
+# --- Gerador de Arquivos RIP Sintéticos ---
+# Produz arquivos nos dois formatos aceitos por '/upload-multi', com tamanho aproximado controlado
+# por linhas de comentário, e variantes que exercitam os casos mais caros da extração.
+
+CORES_PADRAO = ["Cyan", "Brown", "Beige", "Black", "Pink", "Blue", "Yellow", "Luster", "Reactive"]
+CORES_COM_ERROS = ["BEGE", "AMARELHO", "COBALT", "YELOW", "COBALTO", "BEJE", "WHITE", "SINKER", "MATT", "ESMERIL"] # Chaves do COR_MAP_ERROS.
+
+
+def escolher_cores(quantidade, com_erros=False, semente=0):
+    """Retorna 'quantidade' nomes de cores, misturando nomes com erros de digitação se pedido."""
+    aleatorio = random.Random(semente)
+    opcoes = CORES_PADRAO + (CORES_COM_ERROS if com_erros else [])
+    return aleatorio.sample(opcoes, min(quantidade, len(opcoes)))
+
+
+def _registro_formato_1(cor, aleatorio):
+    return (f"Color={cor}\n"
+            f"Dots_Level_1={aleatorio.randint(0, 10**7)}\n"
+            f"Dots_Level_2={aleatorio.randint(0, 10**7)}\n"
+            f"Dots_Level_3={aleatorio.randint(0, 10**7)}\n")
+
+
+def _registro_formato_2(cor, aleatorio):
+    return f"tif_{cor} = {aleatorio.randint(0, 10**7)},{aleatorio.randint(0, 10**7)},{aleatorio.randint(0, 10**7)}\n"
+
+
+def _preencher(partes, tamanho_bytes):
+    """Intercala linhas de comentário entre os registros até atingir aproximadamente 'tamanho_bytes'."""
+    tamanho_atual = sum(len(parte) for parte in partes)
+    faltando = max(tamanho_bytes - tamanho_atual, 0)
+    comentario = "; " + "parametro_de_impressao=" + "x" * 40 + "\n"
+    linhas_por_intervalo = faltando // len(comentario) // (len(partes) + 1) + 1 if faltando else 0
+
+    saida = []
+    for parte in partes:
+        saida.append(comentario * linhas_por_intervalo)
+        saida.append(parte)
+    saida.append(comentario * linhas_por_intervalo)
+    return "".join(saida)
+
+
+def gerar_arquivo(formato=1, cores=None, tamanho_bytes=0, semente=0):
+    """
+    Gera o conteúdo (bytes) de um arquivo RIP.
+    formato 1: 'Color=<cor>' seguido de 'Dots_Level_1..3=<n>' (um campo por linha).
+    formato 2: 'tif_<cor> = d1,d2,d3'.
+    """
+    aleatorio = random.Random(semente)
+    cores = cores or CORES_PADRAO
+    gerar_registro = _registro_formato_1 if formato == 1 else _registro_formato_2
+    partes = [gerar_registro(cor, aleatorio) for cor in cores]
+    return _preencher(partes, tamanho_bytes).encode("utf-8")
+
+
+def gerar_arquivo_adversario(tamanho_bytes, semente=0):
+    """
+    Gera um arquivo que provoca retrocesso (backtracking) na busca preguiçosa do Formato 1:
+    muitos 'Color=' e 'Dots_Level_1/2=' sem nenhum 'Dots_Level_3', seguidos de um único registro
+    válido do Formato 2 no final.
+    """
+    aleatorio = random.Random(semente)
+    bloco = "Color=Cyan\nDots_Level_1=1\nDots_Level_2=2\n"
+    repeticoes = max(tamanho_bytes // len(bloco), 1)
+    return (bloco * repeticoes + _registro_formato_2("Cyan", aleatorio)).encode("utf-8")
@@ -0,0 +1,89 @@
+import os # Importa o módulo 'os', usado para montar o caminho do banco temporário.
+import random # Importa o módulo 'random', usado para gerar os resultados sintéticos.
+import tempfile # Importa o módulo 'tempfile', pois o histórico medido é criado em um diretório temporário.
+import time # Importa o módulo 'time', usado para medir a latência das consultas.
+
+from benchmark.executar import _percentil
+from historico import HistoricoConsumo
+
+# --- Benchmark do Histórico de Consumo ---
+# Preenche um histórico novo com resultados sintéticos (espalhados por um ano) e mede a latência
+# das consultas de totais à medida que ele cresce. A latência deve se manter estável, pois as
+# consultas usam os resumos diários e não as tabelas detalhadas.
+
+LINHAS = ["TRIMS", "LINHA1_2", "LINHA3", "LINHA4", "IAC"]
+CORES = ["Ciano", "Marrom", "Bege", "Preto", "Rosa", "Azul", "Amarelo", "Brilho", "Reativo"]
+DIAS = 365 # Período coberto pelos resultados gerados.
+
+# Tamanhos medidos (registros na tabela 'consumos': um por cor de cada resultado).
+TAMANHOS = [10_000, 100_000, 1_000_000]
+TAMANHOS_RAPIDOS = [10_000, 100_000]
+
+# Consultas medidas: (inicio, fim, linhas, cores, agrupar_por); datas relativas ao início do período.
+CONSULTAS = [
+    (0, 29, None, None, ("linha", "cor")), # Um mês, todas as linhas e cores.
+    (0, DIAS - 1, ["TRIMS"], None, ("cor",)), # Um ano de uma linha, por cor.
+    (0, DIAS - 1, None, ["Preto", "Ciano"], ("dia",)), # Um ano de duas cores, por dia.
+    (0, DIAS - 1, None, None, ("linha",)), # Um ano, média por cálculo de cada linha.
+]
+
+
+def _resultado(aleatorio):
+    """Resultado sintético no formato devolvido por '/upload-multi'."""
+    cores = aleatorio.sample(CORES, aleatorio.randint(3, len(CORES)))
+    itens = [{"cor": cor, "massa_g": round(aleatorio.uniform(0, 5), 5)} for cor in cores]
+    return {"consumo_total_g": round(sum(item["massa_g"] for item in itens), 5), "consumo_por_cor_lista": itens}
+
+
+def _preencher(historico, ate_registros, registros, aleatorio, inicio_periodo):
+    """Registra resultados até a tabela 'consumos' ter 'ate_registros' linhas. Retorna o novo total."""
+    pendentes = 0
+    while registros < ate_registros:
+        resultado = _resultado(aleatorio)
+        criado_em = inicio_periodo + aleatorio.uniform(0, DIAS * 86400)
+        historico.registrar(aleatorio.choice(LINHAS), 30.0, [f"{aleatorio.getrandbits(160):040x}"], resultado, criado_em)
+        registros += len(resultado["consumo_por_cor_lista"])
+        pendentes += 1
+        if pendentes == historico.tamanho_lote: # Grava em lotes, como o gravador em segundo plano.
+            historico.gravar_pendentes()
+            pendentes = 0
+    historico.gravar_pendentes()
+    return registros
+
+
+def medir_historico(tamanhos=TAMANHOS, repeticoes=20, log=print):
+    """Mede as consultas de totais para cada tamanho do histórico. Retorna {cenario: metricas}."""
+    aleatorio = random.Random(0)
+    inicio_periodo = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+    datas = [time.strftime("%Y-%m-%d", time.localtime(inicio_periodo + dia * 86400 + 43200)) for dia in range(DIAS)]
+    resultados = {}
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        historico = HistoricoConsumo(os.path.join(diretorio, "historico.db"), max_pendentes=10**7, iniciar_gravador=False)
+        registros = 0
+        for tamanho in tamanhos:
+            inicio_insercao = time.perf_counter()
+            anteriores = registros
+            registros = _preencher(historico, tamanho, registros, aleatorio, inicio_periodo)
+            tempo_insercao = time.perf_counter() - inicio_insercao
+
+            latencias = []
+            for _ in range(repeticoes):
+                for inicio, fim, linhas, cores, agrupar_por in CONSULTAS:
+                    comeco = time.perf_counter()
+                    historico.totais(datas[inicio], datas[fim], linhas, cores, agrupar_por)
+                    latencias.append(time.perf_counter() - comeco)
+            latencias.sort()
+
+            nome = f"historico-{tamanho // 1000}k" if tamanho < 1_000_000 else f"historico-{tamanho // 1_000_000}M"
+            resultados[nome] = {
+                "registros": registros,
+                "consultas": len(latencias),
+                "p50_ms": _percentil(latencias, 50) * 1000,
+                "p99_ms": _percentil(latencias, 99) * 1000,
+                "registros_por_s": (registros - anteriores) / tempo_insercao,
+            }
+            metricas = resultados[nome]
+            log(f"{nome:<22} p50={metricas['p50_ms']:9.2f} ms  p99={metricas['p99_ms']:9.2f} ms  "
+                f"{metricas['registros_por_s']:10.0f} registros/s gravados")
+    return resultados
@@ -0,0 +1,103 @@
+import hashlib # Importa o módulo 'hashlib', usado para gerar a chave do cache a partir do conteúdo do arquivo.
+import sys # Importa o módulo 'sys', usado para estimar o tamanho (em bytes) de cada entrada.
+import threading # Importa o módulo 'threading', pois o servidor (waitress) atende requisições em várias threads.
+from collections import OrderedDict # Dicionário ordenado, usado para manter a ordem de uso (LRU).
+
+from leitor_rip import TAMANHO_BLOCO # Reutiliza o mesmo tamanho de bloco do leitor de arquivos RIP.
+
+# --- Cache LRU de Totais de Dots por Arquivo ---
+# Guarda o 'sum_dots' já normalizado (cores após COR_MAP_ERROS) de cada arquivo, indexado pelo hash
+# do seu conteúdo. Um arquivo reenviado (mesmo com outra linha ou porcentagem) não é lido novamente.
+
+
+def novo_hash():
+    """Objeto de hash (BLAKE2b) usado para as chaves do cache."""
+    return hashlib.blake2b(digest_size=20)
+
+
+def hash_conteudo(stream):
+    """Calcula o hash do conteúdo do stream, lendo-o em blocos, e volta o ponteiro ao início."""
+    stream.seek(0)
+    hash_arquivo = novo_hash()
+    for bloco in iter(lambda: stream.read(TAMANHO_BLOCO), b''): # Lê até o fim sem carregar o arquivo inteiro.
+        hash_arquivo.update(bloco)
+    stream.seek(0) # Deixa o stream pronto para a leitura dos registros em caso de 'miss'.
+    return hash_arquivo.hexdigest()
+
+
+def tamanho_sum_dots(sum_dots):
+    """Estimativa (em bytes) da memória ocupada por um dicionário 'sum_dots'."""
+    tamanho = sys.getsizeof(sum_dots)
+    for cor_en, dots in sum_dots.items():
+        tamanho += sys.getsizeof(cor_en) + sys.getsizeof(dots) + sum(sys.getsizeof(valor) for valor in dots.values())
+    return tamanho
+
+
+def _tamanho_entrada(chave, sum_dots):
+    """Estimativa (em bytes) da memória ocupada por uma entrada do cache."""
+    return sys.getsizeof(chave) + tamanho_sum_dots(sum_dots)
+
+
+class CacheDots:
+    """
+    Cache LRU de 'sum_dots' por arquivo, limitado pelo número de entradas e pelo total de bytes.
+    Os dicionários guardados são compartilhados entre requisições e nunca devem ser alterados.
+    """
+
+    def __init__(self, max_entradas=256, max_bytes=16 * 1024 * 1024):
+        self.max_entradas = max_entradas # Limite de arquivos guardados (0 desativa o cache).
+        self.max_bytes = max_bytes # Limite da soma dos tamanhos estimados das entradas.
+        self._entradas = OrderedDict() # chave -> (sum_dots, tamanho); a entrada mais antiga fica no início.
+        self._bytes = 0 # Soma atual dos tamanhos das entradas.
+        self._trava = threading.Lock()
+        self.hits = 0 # Número de consultas atendidas pelo cache.
+        self.misses = 0 # Número de consultas que exigiram a leitura do arquivo.
+        self.evictions = 0 # Número de entradas removidas para respeitar os limites.
+
+    def obter(self, chave):
+        """Retorna o 'sum_dots' guardado para a chave (marcando-o como recente) ou None."""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave) # Marca a entrada como a mais recentemente usada.
+            self.hits += 1
+            return entrada[0]
+
+    def guardar(self, chave, sum_dots):
+        """Guarda o 'sum_dots' de um arquivo, removendo as entradas menos usadas se os limites forem excedidos."""
+        tamanho = _tamanho_entrada(chave, sum_dots)
+        if tamanho > self.max_bytes or self.max_entradas <= 0: # Entrada que nunca caberia no cache.
+            return
+
+        with self._trava:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[chave] = (sum_dots, tamanho)
+            self._bytes += tamanho
+
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, tamanho_removido) = self._entradas.popitem(last=False) # Remove a entrada menos recentemente usada.
+                self._bytes -= tamanho_removido
+                self.evictions += 1
+
+    def limpar(self):
+        """Remove todas as entradas (os contadores são mantidos)."""
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        """Retorna um dicionário com o estado atual e os contadores do cache."""
+        with self._trava:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_entradas": self.max_entradas,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,134 @@
+import tarfile # Importa o módulo 'tarfile', usado para ler arquivos .tar/.tar.gz em modo streaming.
+import zipfile # Importa o módulo 'zipfile', usado para ler arquivos .zip.
+import zlib # Importa o módulo 'zlib', cujos erros indicam dados compactados corrompidos.
+
+from cache_dots import novo_hash # Hash usado como chave do cache (o mesmo dos arquivos enviados avulsos).
+
+# --- Leitura de Arquivos Compactados ---
+# Os membros de um .zip ou .tar.gz são lidos diretamente do upload, descompactados sob demanda
+# (sem extrair para o disco nem carregar o pacote inteiro na memória), com limites contra
+# "zip bombs": número máximo de membros e total máximo de bytes descompactados por pacote.
+
+EXTENSOES_ZIP = ('.zip',)
+EXTENSOES_TAR = ('.tar', '.tar.gz', '.tgz')
+
+_ERROS_DADOS = (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError) # Pacote corrompido ou truncado.
+
+
+class CompactadoInvalidoError(ValueError):
+    """O pacote (ou um de seus membros) não pôde ser lido."""
+
+
+class LimiteCompactadoError(ValueError):
+    """O pacote excede o número de membros ou o total de bytes descompactados permitido."""
+
+
+def e_compactado(nome_arquivo):
+    """Indica, pela extensão, se o arquivo enviado é um pacote .zip ou .tar(.gz)."""
+    nome = (nome_arquivo or '').lower()
+    return nome.endswith(EXTENSOES_ZIP + EXTENSOES_TAR)
+
+
+def _ignorar_membro(nome_membro):
+    """Membros sem conteúdo RIP: diretórios e metadados do macOS ('__MACOSX/', '._arquivo')."""
+    return nome_membro.endswith('/') or nome_membro.startswith('__MACOSX/') or nome_membro.rsplit('/', 1)[-1].startswith('._')
+
+
+class _Limite:
+    """Total de bytes descompactados ainda permitido para o pacote (compartilhado entre os membros)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lidos = 0
+
+
+class LeitorMembro:
+    """
+    Stream de leitura de um membro: calcula o hash do conteúdo enquanto é lido e interrompe a
+    leitura (LimiteCompactadoError) quando o total descompactado do pacote passa do limite.
+    """
+
+    def __init__(self, stream, nome, limite):
+        self.nome = nome # Nome exibido nos erros ('pacote.zip/pasta/arquivo.dat').
+        self.hash = novo_hash() # Hash do conteúdo lido até agora.
+        self.bytes_lidos = 0
+        self._stream = stream
+        self._limite = limite
+
+    def read(self, tamanho=-1):
+        try:
+            bloco = self._stream.read(tamanho)
+        except _ERROS_DADOS as erro:
+            raise CompactadoInvalidoError(f"Não foi possível descompactar {self.nome}.") from erro
+        self.bytes_lidos += len(bloco)
+        self._limite.lidos += len(bloco)
+        if self._limite.lidos > self._limite.max_bytes:
+            raise LimiteCompactadoError(
+                f"Conteúdo descompactado excede o limite de {self._limite.max_bytes} bytes em {self.nome}.")
+        self.hash.update(bloco)
+        return bloco
+
+
+def iterar_membros(stream, nome_pacote, max_membros, max_bytes):
+    """
+    Gera um LeitorMembro para cada arquivo do pacote, na ordem em que aparecem. Cada leitor deve ser
+    lido até o fim antes de avançar para o próximo (os .tar são lidos sequencialmente).
+    Lança CompactadoInvalidoError e LimiteCompactadoError.
+    """
+    limite = _Limite(max_bytes)
+    stream.seek(0)
+    if nome_pacote.lower().endswith(EXTENSOES_ZIP):
+        yield from _membros_zip(stream, nome_pacote, max_membros, limite)
+    else:
+        yield from _membros_tar(stream, nome_pacote, max_membros, limite)
+
+
+def _membros_zip(stream, nome_pacote, max_membros, limite):
+    try:
+        pacote = zipfile.ZipFile(stream) # Lê apenas o diretório central; os membros são descompactados sob demanda.
+    except _ERROS_DADOS as erro:
+        raise CompactadoInvalidoError(f"Arquivo compactado inválido: {nome_pacote}.") from erro
+
+    with pacote:
+        membros = [info for info in pacote.infolist() if not _ignorar_membro(info.filename)]
+        if len(membros) > max_membros:
+            raise LimiteCompactadoError(f"{nome_pacote} contém {len(membros)} arquivos (limite: {max_membros}).")
+        for info in membros:
+            nome = f"{nome_pacote}/{info.filename}"
+            if limite.lidos + info.file_size > limite.max_bytes: # Tamanho declarado (o tamanho real também é verificado na leitura).
+                raise LimiteCompactadoError(f"Conteúdo descompactado excede o limite de {limite.max_bytes} bytes em {nome}.")
+            try:
+                membro = pacote.open(info)
+            except (_ERROS_DADOS + (NotImplementedError, RuntimeError)) as erro: # Inclui compressão não suportada e senha.
+                raise CompactadoInvalidoError(f"Não foi possível descompactar {nome}.") from erro
+            with membro:
+                yield LeitorMembro(membro, nome, limite)
+
+
+def _membros_tar(stream, nome_pacote, max_membros, limite):
+    try:
+        pacote = tarfile.open(fileobj=stream, mode='r|*') # Modo streaming: lê o pacote uma única vez, do início ao fim.
+    except _ERROS_DADOS as erro:
+        raise CompactadoInvalidoError(f"Arquivo compactado inválido: {nome_pacote}.") from erro
+
+    with pacote:
+        quantidade = 0
+        while True:
+            try:
+                info = pacote.next()
+            except _ERROS_DADOS as erro:
+                raise CompactadoInvalidoError(f"Arquivo compactado inválido: {nome_pacote}.") from erro
+            if info is None: # Fim do pacote.
+                return
+            # Todos os membros contam nos limites, inclusive os ignorados: no modo streaming, o
+            # conteúdo deles também é descompactado ao avançar para o próximo cabeçalho.
+            quantidade += 1
+            if quantidade > max_membros:
+                raise LimiteCompactadoError(f"{nome_pacote} contém mais de {max_membros} arquivos.")
+            nome = f"{nome_pacote}/{info.name}"
+            if limite.lidos + info.size > limite.max_bytes: # Tamanho declarado no cabeçalho do membro.
+                raise LimiteCompactadoError(f"Conteúdo descompactado excede o limite de {limite.max_bytes} bytes em {nome}.")
+            if not info.isfile() or _ignorar_membro(info.name):
+                limite.lidos += info.size
+                continue
+            yield LeitorMembro(pacote.extractfile(info), nome, limite)
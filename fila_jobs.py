@@ -0,0 +1,120 @@
+import queue # Importa o módulo 'queue', que fornece a fila limitada (backpressure) entre a API e os workers.
+import threading # Importa o módulo 'threading', usado para os workers em segundo plano.
+import time # Importa o módulo 'time', usado para controlar o TTL dos resultados.
+import uuid # Importa o módulo 'uuid', usado para gerar o identificador de cada job.
+
+# --- Fila de Jobs em Segundo Plano ---
+# Executa cálculos longos fora da requisição HTTP, sem broker externo: uma fila limitada em memória
+# e um número fixo de threads (workers) no próprio processo.
+
+PENDENTE = "pendente" # Job aguardando um worker.
+EXECUTANDO = "executando" # Job sendo processado.
+CONCLUIDO = "concluido" # Job finalizado com sucesso.
+ERRO = "erro" # Job finalizado com erro.
+
+
+class FilaCheiaError(Exception):
+    """A fila de jobs atingiu o limite de jobs pendentes."""
+
+
+class FilaJobs:
+    """
+    Fila limitada de jobs executados por 'max_simultaneos' workers.
+
+    Cada job é uma função sem argumentos que retorna o resultado (dict) ou lança uma exceção; a função
+    'tratar_erro' converte a exceção no resultado de erro. Os jobs finalizados são removidos após
+    'ttl_segundos'. Com 'iniciar_workers=False' nenhum thread é criado e os jobs são executados
+    por 'executar_proximo()' (útil em testes).
+    """
+
+    def __init__(self, max_pendentes=32, max_simultaneos=2, ttl_segundos=600, tratar_erro=None, iniciar_workers=True):
+        self.max_simultaneos = max_simultaneos # Número de workers (jobs executados ao mesmo tempo).
+        self.ttl_segundos = ttl_segundos # Tempo que um resultado finalizado fica disponível para consulta.
+        self._tratar_erro = tratar_erro or (lambda erro: {"error": str(erro)}) # Converte uma exceção no resultado do job.
+        self._fila = queue.Queue(maxsize=max_pendentes) # Fila limitada: 'put' falha quando está cheia.
+        self._jobs = {} # id -> dicionário com o estado do job.
+        self._trava = threading.Lock()
+        self._workers = []
+        if iniciar_workers:
+            for indice in range(max_simultaneos):
+                worker = threading.Thread(target=self._executar_worker, name=f"fila-jobs-{indice}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def enviar(self, funcao, ao_finalizar=None):
+        """
+        Enfileira um job e retorna seu id. Lança FilaCheiaError se a fila estiver cheia.
+        'ao_finalizar' (opcional) é chamada após a execução, com sucesso ou erro (ex: liberar arquivos).
+        """
+        self.limpar_expirados()
+        id_job = uuid.uuid4().hex
+        job = {"id": id_job, "status": PENDENTE, "resultado": None, "criado_em": time.time(), "finalizado_em": None}
+        with self._trava:
+            self._jobs[id_job] = job
+        try:
+            self._fila.put_nowait((id_job, funcao, ao_finalizar)) # Não bloqueia a requisição: recusa quando cheia.
+        except queue.Full:
+            with self._trava:
+                del self._jobs[id_job]
+            raise FilaCheiaError("Fila de processamento cheia.")
+        return id_job
+
+    def consultar(self, id_job):
+        """Retorna uma cópia do estado do job (ou None se não existir ou já tiver expirado)."""
+        self.limpar_expirados()
+        with self._trava:
+            job = self._jobs.get(id_job)
+            return dict(job) if job is not None else None
+
+    def executar_proximo(self, bloquear=False):
+        """Executa o próximo job da fila na thread atual. Retorna False se a fila estiver vazia."""
+        try:
+            id_job, funcao, ao_finalizar = self._fila.get(block=bloquear)
+        except queue.Empty:
+            return False
+        try:
+            self._executar(id_job, funcao, ao_finalizar)
+        finally:
+            self._fila.task_done()
+        return True
+
+    def limpar_expirados(self):
+        """Remove os jobs finalizados há mais de 'ttl_segundos'."""
+        limite = time.time() - self.ttl_segundos
+        with self._trava:
+            expirados = [id_job for id_job, job in self._jobs.items()
+                         if job["finalizado_em"] is not None and job["finalizado_em"] < limite]
+            for id_job in expirados:
+                del self._jobs[id_job]
+
+    def estatisticas(self):
+        """Retorna a quantidade de jobs por status e o tamanho atual da fila."""
+        with self._trava:
+            por_status = {PENDENTE: 0, EXECUTANDO: 0, CONCLUIDO: 0, ERRO: 0}
+            for job in self._jobs.values():
+                por_status[job["status"]] += 1
+        return {"fila": self._fila.qsize(), "max_pendentes": self._fila.maxsize, **por_status}
+
+    def _executar_worker(self):
+        """Laço de cada worker: executa os jobs da fila indefinidamente."""
+        while True:
+            self.executar_proximo(bloquear=True)
+            self.limpar_expirados()
+
+    def _executar(self, id_job, funcao, ao_finalizar):
+        """Executa um job e registra o resultado (ou o erro)."""
+        self._atualizar(id_job, status=EXECUTANDO)
+        try:
+            resultado, status = funcao(), CONCLUIDO
+        except Exception as erro: # Qualquer falha do job é registrada no próprio job.
+            resultado, status = self._tratar_erro(erro), ERRO
+        finally:
+            if ao_finalizar is not None:
+                ao_finalizar()
+        self._atualizar(id_job, status=status, resultado=resultado, finalizado_em=time.time())
+
+    def _atualizar(self, id_job, **campos):
+        with self._trava:
+            job = self._jobs.get(id_job)
+            if job is not None:
+                job.update(campos)
@@ -0,0 +1,213 @@
+import datetime # Importa o módulo 'datetime', usado para converter o horário de cada cálculo no dia do resumo.
+import json # Importa o módulo 'json', usado para guardar a lista de hashes dos arquivos.
+import logging # Importa o módulo 'logging', usado para registrar as falhas de gravação.
+import queue # Importa o módulo 'queue', que separa a requisição (produtora) do gravador em segundo plano.
+import sqlite3 # Importa o módulo 'sqlite3', banco de dados embutido onde o histórico é gravado.
+import threading # Importa o módulo 'threading', usado para o gravador em segundo plano e as conexões por thread.
+import time # Importa o módulo 'time', usado para o horário de cada cálculo.
+
+# --- Histórico de Consumo (SQLite) ---
+# Cada resultado calculado é enfileirado pela requisição (sem acesso ao disco) e gravado em lotes
+# por uma thread dedicada. Além das tabelas detalhadas, resumos diários (por linha e cor, e por linha)
+# são atualizados na mesma transação, para que as consultas por período não dependam do tamanho do histórico.
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS calculos (
+    id INTEGER PRIMARY KEY,
+    criado_em REAL NOT NULL,              -- horário do cálculo (segundos desde 1970, UTC)
+    linha TEXT NOT NULL,
+    porcentagem REAL NOT NULL,
+    consumo_total_g REAL NOT NULL,
+    hashes_arquivos TEXT NOT NULL         -- lista JSON com o hash do conteúdo de cada arquivo
+);
+CREATE TABLE IF NOT EXISTS consumos (
+    calculo_id INTEGER NOT NULL REFERENCES calculos(id),
+    criado_em REAL NOT NULL,
+    linha TEXT NOT NULL,
+    cor TEXT NOT NULL,
+    massa_g REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consumos_diarios (
+    dia TEXT NOT NULL,                    -- AAAA-MM-DD (horário local do servidor)
+    linha TEXT NOT NULL,
+    cor TEXT NOT NULL,
+    total_g REAL NOT NULL,
+    calculos INTEGER NOT NULL,
+    PRIMARY KEY (dia, linha, cor)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS calculos_diarios (
+    dia TEXT NOT NULL,
+    linha TEXT NOT NULL,
+    total_g REAL NOT NULL,                -- soma de 'consumo_total_g'
+    calculos INTEGER NOT NULL,
+    PRIMARY KEY (dia, linha)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_calculos_linha_tempo ON calculos (linha, criado_em);
+CREATE INDEX IF NOT EXISTS ix_calculos_tempo ON calculos (criado_em);
+CREATE INDEX IF NOT EXISTS ix_consumos_linha_tempo ON consumos (linha, criado_em);
+CREATE INDEX IF NOT EXISTS ix_consumos_cor_tempo ON consumos (cor, criado_em);
+CREATE INDEX IF NOT EXISTS ix_consumos_tempo ON consumos (criado_em);
+CREATE INDEX IF NOT EXISTS ix_diarios_linha_dia ON consumos_diarios (linha, dia);
+CREATE INDEX IF NOT EXISTS ix_diarios_cor_dia ON consumos_diarios (cor, dia);
+CREATE INDEX IF NOT EXISTS ix_calculos_diarios_linha_dia ON calculos_diarios (linha, dia);
+"""
+
+AGRUPAMENTOS = ('dia', 'linha', 'cor') # Colunas aceitas em 'agrupar_por'.
+
+logger = logging.getLogger(__name__)
+
+
+class HistoricoConsumo:
+    """
+    Histórico dos resultados de consumo gravado em SQLite.
+
+    'registrar' apenas enfileira o resultado; o gravador grava até 'tamanho_lote' resultados por
+    transação, a cada 'intervalo_segundos' ou assim que um lote se completa. Com 'iniciar_gravador=False'
+    os resultados só são gravados por 'gravar_pendentes()' (útil em testes e no benchmark).
+    """
+
+    def __init__(self, caminho, tamanho_lote=500, intervalo_segundos=1.0, max_pendentes=10000, iniciar_gravador=True):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_segundos = intervalo_segundos
+        self.descartados = 0 # Resultados não gravados (fila cheia ou falha na gravação do lote).
+        self._trava_descartados = threading.Lock() # 'registrar' é chamado por várias requisições ao mesmo tempo.
+        self._fila = queue.Queue(maxsize=max_pendentes)
+        self._local = threading.local() # Uma conexão por thread (conexões SQLite não são compartilhadas).
+        self._trava_gravacao = threading.Lock() # Serializa os lotes (gravador e 'gravar_pendentes').
+        self._acordar = threading.Event() # Sinaliza ao gravador que um lote está completo.
+
+        conexao = self._conexao()
+        conexao.executescript(ESQUEMA)
+        conexao.commit()
+
+        if iniciar_gravador:
+            threading.Thread(target=self._executar_gravador, name="historico-gravador", daemon=True).start()
+
+    def registrar(self, linha, porcentagem, hashes_arquivos, resultado, criado_em=None):
+        """Enfileira um resultado (o JSON devolvido por '/upload-multi') sem bloquear a requisição."""
+        item = (criado_em if criado_em is not None else time.time(), linha, porcentagem, list(hashes_arquivos), resultado)
+        try:
+            self._fila.put_nowait(item)
+        except queue.Full: # O histórico nunca atrasa a resposta: o resultado é descartado e contado.
+            self._descartar(1)
+            return
+        if self._fila.qsize() >= self.tamanho_lote:
+            self._acordar.set() # Lote completo: não espera o fim do intervalo.
+
+    def gravar_pendentes(self):
+        """Grava imediatamente todos os resultados enfileirados, em lotes. Retorna quantos foram gravados."""
+        gravados = 0
+        while True:
+            lote = []
+            while len(lote) < self.tamanho_lote:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return gravados
+            try:
+                self._gravar(lote)
+            except sqlite3.Error: # O lote é perdido (a transação já foi desfeita), mas os demais ainda são gravados.
+                logger.exception("Falha ao gravar %d resultados no histórico %s", len(lote), self.caminho)
+                self._descartar(len(lote))
+                continue
+            gravados += len(lote)
+
+    def totais(self, inicio=None, fim=None, linhas=None, cores=None, agrupar_por=('linha', 'cor')):
+        """
+        Totais e médias de massa (g) no período [inicio, fim] (datas 'AAAA-MM-DD', inclusivas),
+        filtrando por linhas e cores (opcional). Retorna uma lista de dicionários com as colunas de
+        'agrupar_por' e 'total_g', 'calculos' (resultados somados) e 'media_g' (total_g / calculos).
+        Sem 'cor' no agrupamento nem no filtro, os totais são os de cada cálculo ('consumo_total_g').
+        """
+        colunas = [coluna for coluna in agrupar_por if coluna in AGRUPAMENTOS]
+        por_cor = 'cor' in colunas or bool(cores)
+        tabela = "consumos_diarios" if por_cor else "calculos_diarios"
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append("dia >= ?")
+            parametros.append(inicio)
+        if fim is not None:
+            condicoes.append("dia <= ?")
+            parametros.append(fim)
+        for coluna, valores in (("linha", linhas), ("cor", cores)):
+            if valores:
+                condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})")
+                parametros.extend(valores)
+
+        selecao = ", ".join(colunas + ["SUM(total_g)", "SUM(calculos)"])
+        sql = f"SELECT {selecao} FROM {tabela}"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        if colunas:
+            sql += f" GROUP BY {', '.join(colunas)} ORDER BY {', '.join(colunas)}"
+
+        resultado = []
+        for linha_sql in self._conexao().execute(sql, parametros):
+            *valores, total_g, calculos = linha_sql
+            if not calculos:
+                continue # Sem dados no período (SUM sobre nenhuma linha).
+            item = dict(zip(colunas, valores))
+            item.update({"total_g": round(total_g, 5), "calculos": calculos, "media_g": round(total_g / calculos, 5)})
+            resultado.append(item)
+        return resultado
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL") # Leituras não bloqueiam a gravação (e vice-versa).
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def _executar_gravador(self):
+        """Laço do gravador: grava os pendentes a cada 'intervalo_segundos' ou quando um lote se completa."""
+        while True:
+            self._acordar.wait(self.intervalo_segundos)
+            self._acordar.clear()
+            self.gravar_pendentes() # Falhas de gravação são registradas e contadas sem derrubar o gravador.
+
+    def _descartar(self, quantidade):
+        with self._trava_descartados:
+            self.descartados += quantidade
+
+    def _gravar(self, lote):
+        if not lote:
+            return
+        with self._trava_gravacao:
+            conexao = self._conexao()
+            with conexao: # Transação única: commit ao final (ou rollback em caso de erro).
+                diarios = {} # (dia, linha, cor) -> [total_g, calculos]
+                diarios_linha = {} # (dia, linha) -> [total_g, calculos]
+                for criado_em, linha, porcentagem, hashes_arquivos, resultado in lote:
+                    cursor = conexao.execute(
+                        "INSERT INTO calculos (criado_em, linha, porcentagem, consumo_total_g, hashes_arquivos) VALUES (?, ?, ?, ?, ?)",
+                        (criado_em, linha, porcentagem, resultado["consumo_total_g"], json.dumps(hashes_arquivos)))
+                    calculo_id = cursor.lastrowid
+                    itens = resultado["consumo_por_cor_lista"]
+                    conexao.executemany(
+                        "INSERT INTO consumos (calculo_id, criado_em, linha, cor, massa_g) VALUES (?, ?, ?, ?, ?)",
+                        [(calculo_id, criado_em, linha, item["cor"], item["massa_g"]) for item in itens])
+
+                    dia = datetime.datetime.fromtimestamp(criado_em).date().isoformat()
+                    total = diarios_linha.setdefault((dia, linha), [0.0, 0])
+                    total[0] += resultado["consumo_total_g"]
+                    total[1] += 1
+                    for item in itens:
+                        total = diarios.setdefault((dia, linha, item["cor"]), [0.0, 0])
+                        total[0] += item["massa_g"]
+                        total[1] += 1
+
+                conexao.executemany(
+                    "INSERT INTO consumos_diarios (dia, linha, cor, total_g, calculos) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (dia, linha, cor) DO UPDATE SET "
+                    "total_g = total_g + excluded.total_g, calculos = calculos + excluded.calculos",
+                    [(dia, linha, cor, total_g, calculos) for (dia, linha, cor), (total_g, calculos) in diarios.items()])
+                conexao.executemany(
+                    "INSERT INTO calculos_diarios (dia, linha, total_g, calculos) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (dia, linha) DO UPDATE SET "
+                    "total_g = total_g + excluded.total_g, calculos = calculos + excluded.calculos",
+                    [(dia, linha, total_g, calculos) for (dia, linha), (total_g, calculos) in diarios_linha.items()])
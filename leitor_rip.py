@@ -0,0 +1,289 @@
+import io # Importa o módulo 'io', usado para obter o tamanho do arquivo (posicionando o stream no fim).
+import mmap # Importa o módulo 'mmap', usado para varrer os arquivos grandes direto do disco.
+import re # Importa o módulo 're' (Regular Expressions), usado para localizar cada campo dos arquivos RIP.
+import time # Importa o módulo 'time', usado para medir (opcionalmente) o tempo de cada etapa da leitura.
+
+# --- Leitor Incremental de Arquivos RIP ---
+# Os campos são localizados diretamente nos bytes do arquivo (sem decodificar o texto): apenas os
+# nomes de cores e os números encontrados viram objetos Python. Arquivos pequenos são lidos em blocos
+# de tamanho fixo, mantendo em memória só o trecho ainda não consumido; arquivos grandes em disco
+# são mapeados na memória (mmap) e varridos sem cópia, com uso de memória independente do tamanho.
+
+TAMANHO_BLOCO = 64 * 1024 # Tamanho (em bytes) de cada leitura feita no stream do arquivo.
+TAMANHO_MINIMO_MMAP = 1024 * 1024 # A partir deste tamanho (em bytes), o arquivo é mapeado em vez de lido em blocos.
+
+
+class FormatoDesconhecidoError(ValueError):
+    """Nenhum registro do Formato 1 nem do Formato 2 foi encontrado no arquivo."""
+
+
+def _parcial(literal, cauda):
+    """
+    Monta a regex que reconhece o *início* de um campo cortado pelo fim do bloco
+    (qualquer prefixo do literal, ou o literal completo seguido de um prefixo da cauda).
+    """
+    padrao = cauda # O trecho mais interno é a cauda (já opcional por construção).
+    for indice in reversed(range(1, len(literal))): # Aninha os caracteres do literal de dentro para fora.
+        padrao = b'(?:' + re.escape(literal[indice:indice + 1]) + padrao + b')?'
+    return re.compile(re.escape(literal[:1]) + padrao + rb'\Z') # Exige ao menos o primeiro caractere e ancora no fim do texto.
+
+
+# Nos bytes, '\w' e '\s' só reconhecem caracteres ASCII. Para reproduzir a busca original (em texto
+# Unicode), o nome da cor aceita também os bytes acima de 0x7F e é depois aparado (em '_nome_cor')
+# até o fim do seu trecho inicial de caracteres de palavra; os espaços aceitam também os espaços
+# Unicode codificados em UTF-8 (ex: o espaço não separável, b'\xc2\xa0').
+_COR = rb'[\w\x80-\xff]'
+# Espaços Unicode em UTF-8: U+0085, U+00A0, U+1680, U+2000-U+200A, U+2028, U+2029, U+202F, U+205F e U+3000.
+_ESPACO = rb'(?:[\s\x1c-\x1f]|\xc2[\x85\xa0]|\xe1\x9a\x80|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)'
+_ESPACO_PARCIAL = rb'[\s\x1c-\x1f\x80-\xff]' # Inclui espaços multibyte cortados pelo fim do bloco.
+_PALAVRA = re.compile(r'\w+') # Trecho inicial do nome da cor (já decodificado) aceito pela busca original.
+_FIM_NOME_NIVEL_1 = 'Dots_Level_1' # Final de nome que permite o registro alternativo (ver '_extrair').
+
+# Formato 1 (Color=... Dots_Level_X=...): cada campo é buscado em sequência, na ordem abaixo,
+# reproduzindo a busca preguiçosa 'Color=(\w+).*?Dots_Level_1=(\d+).*?...' com re.DOTALL.
+_CAMPOS_FORMATO_1 = [
+    (re.compile(rb'Color=(' + _COR + rb'+)'), _parcial(b'Color=', _COR + rb'*')),
+    (re.compile(rb'Dots_Level_1=(\d+)'), _parcial(b'Dots_Level_1=', rb'\d*')),
+    (re.compile(rb'Dots_Level_2=(\d+)'), _parcial(b'Dots_Level_2=', rb'\d*')),
+    (re.compile(rb'Dots_Level_3=(\d+)'), _parcial(b'Dots_Level_3=', rb'\d*')),
+]
+
+# Formato 2 (tif_cor=d1,d2,d3): o registro inteiro é um único campo.
+_CAMPO_FORMATO_2 = (
+    re.compile(rb'tif_(' + _COR + rb'+)' + _ESPACO + rb'*=' + _ESPACO + rb'*(\d+),(\d+),(\d+)'),
+    _parcial(b'tif_', rb'(?:' + _COR + rb'+' + _ESPACO_PARCIAL + rb'*(?:=' + _ESPACO_PARCIAL + rb'*(?:\d+(?:,(?:\d+(?:,\d*)?)?)?)?)?)?'),
+)
+
+
+def _buscar(campo, texto, pos, fim):
+    """
+    Procura o próximo campo completo a partir de 'pos'.
+    Retorna (match, nova_pos); quando não há match, 'nova_pos' aponta para o início
+    de um possível campo cortado no fim do bloco (de onde a busca deve recomeçar).
+    """
+    regex, regex_parcial = campo
+    match = regex.search(texto, pos)
+    if match and (fim or match.end() < len(texto)): # Um match que termina no fim do bloco ainda pode crescer (\w+ e \d+ são gulosos).
+        return match, match.end()
+    if fim:
+        return None, len(texto) # Sem mais dados: nada mais a encontrar.
+    parcial = regex_parcial.search(texto, pos) # Localiza o trecho final que ainda pode virar um campo completo.
+    return None, parcial.start() if parcial else len(texto)
+
+
+def _nome_cor(cor, formato_2=False):
+    """
+    Converte o nome de uma cor (bytes) em str, decodificando-o como UTF-8 ou, se inválido, como Latin-1
+    (que nunca falha), e o apara até o fim do trecho inicial de caracteres de palavra, como o '\\w+'
+    da busca original. No Formato 2, o restante só pode ser de espaços (que precedem o '=').
+    Retorna (nome, tamanho do nome em bytes), ou None se a busca original não aceitaria o campo.
+    """
+    if cor.isascii(): # Caso comum: em ASCII, '_COR' só aceita caracteres de palavra.
+        return cor.decode('ascii'), len(cor)
+    try:
+        nome, codificacao = cor.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        nome, codificacao = cor.decode('latin-1'), 'latin-1'
+    palavra = _PALAVRA.match(nome)
+    if palavra is None:
+        return None
+    resto = nome[palavra.end():]
+    if formato_2 and resto and not resto.isspace():
+        return None
+    nome = palavra.group()
+    return nome, len(nome.encode(codificacao))
+
+
+def _registro(grupos):
+    """Converte os valores capturados de um registro (cor já em str, dots em bytes) em strings."""
+    cor, dots_l1, dots_l2, dots_l3 = grupos
+    return cor, dots_l1.decode('ascii'), dots_l2.decode('ascii'), dots_l3.decode('ascii')
+
+
+def _mapear(stream):
+    """
+    Mapeia na memória o arquivo por trás do stream, se ele for grande o bastante e estiver em disco.
+    Um SpooledTemporaryFile ainda em memória é antes gravado no disco ('rollover').
+    Retorna (mapa, posição atual do stream) ou None (o arquivo deve ser lido em blocos).
+    """
+    try:
+        inicio = stream.tell()
+        tamanho = stream.seek(0, io.SEEK_END)
+        stream.seek(inicio)
+        if tamanho - inicio < TAMANHO_MINIMO_MMAP:
+            return None
+        if hasattr(stream, 'rollover'):
+            stream.rollover()
+        mapa = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError): # Stream sem posição ou sem arquivo (ex: BytesIO, membro de pacote).
+        return None
+    if hasattr(mapa, 'madvise'):
+        mapa.madvise(mmap.MADV_SEQUENTIAL) # A varredura é sequencial: permite a leitura antecipada do disco.
+    return mapa, inicio
+
+
+def _blocos(stream, tamanho_bloco, tempos):
+    """Gera os blocos lidos do stream e, por último, um bloco vazio (fim do arquivo)."""
+    while True:
+        if tempos is not None:
+            inicio = time.perf_counter()
+        bloco = stream.read(tamanho_bloco)
+        if tempos is not None:
+            tempos['leitura'] += time.perf_counter() - inicio
+        yield bloco
+        if not bloco:
+            return
+
+
+def extrair_canais(stream, tamanho_bloco=TAMANHO_BLOCO, tempos=None):
+    """
+    Gera as tuplas (cor, l1, l2, l3) (como strings) de um arquivo RIP, a partir da posição atual do stream.
+
+    Os dois formatos são varridos na mesma passada. O Formato 1 tem prioridade (como no
+    'if canais_rip1' original): assim que um registro dele é encontrado, os registros do
+    Formato 2 são descartados. Os do Formato 2 só são emitidos ao final do arquivo.
+
+    Arquivos a partir de TAMANHO_MINIMO_MMAP bytes em disco são varridos por mmap; os demais
+    streams são lidos em blocos de 'tamanho_bloco' bytes. O conteúdo não precisa ser UTF-8 válido.
+
+    Se 'tempos' for informado (ex: defaultdict(float)), soma nele os segundos gastos em 'leitura'
+    e 'extracao' (esta inclui o processamento de cada registro emitido).
+
+    Lança FormatoDesconhecidoError se nenhum dos formatos for reconhecido.
+    """
+    if tempos is not None:
+        inicio = time.perf_counter()
+    mapeado = _mapear(stream)
+    if tempos is not None:
+        tempos['leitura'] += time.perf_counter() - inicio
+
+    if mapeado is None:
+        yield from _extrair(_blocos(stream, tamanho_bloco, tempos), tempos)
+        return
+    mapa, inicio_arquivo = mapeado
+    try:
+        yield from _extrair([mapa], tempos, completo=True, pos_inicial=inicio_arquivo)
+    finally:
+        mapa.close()
+
+
+def _extrair(blocos, tempos, completo=False, pos_inicial=0):
+    """
+    Varre os blocos em sequência e gera os registros. O fim do arquivo é indicado por um bloco vazio;
+    com 'completo=True', o único bloco (o mmap) já é o arquivo inteiro e é varrido sem cópias.
+    """
+    texto = b'' # Trecho ainda não consumido (bytes; ou o mapa inteiro do arquivo).
+    pos_1 = pos_inicial # Posição de busca do Formato 1 dentro de 'texto'.
+    pos_2 = pos_inicial # Posição de busca do Formato 2 dentro de 'texto'.
+    campo_atual = 0 # Índice do próximo campo esperado do Formato 1.
+    registro = [] # Valores já capturados do registro do Formato 1 em andamento.
+    # Na busca original, 'Color=(\w+)' pode devolver caracteres para que 'Dots_Level_1=' comece dentro do
+    # nome (ex: 'Color=CyanDots_Level_1=5'). Esse registro alternativo ([campo, pos, valores]) só vale se
+    # o registro com o nome inteiro não se completar até o fim do arquivo; ele é buscado em paralelo.
+    alternativa = None
+    registros_formato_2 = [] # Registros do Formato 2 aguardando o fim do arquivo (None quando o Formato 1 foi confirmado).
+
+    for bloco in blocos:
+        fim = completo or not bloco # Um bloco vazio indica o fim do arquivo.
+        texto = bloco if completo else texto + bloco
+        if tempos is not None:
+            inicio = time.perf_counter()
+
+        # Formato 1: avança campo a campo; um registro completo é emitido imediatamente.
+        while True:
+            match, pos_1 = _buscar(_CAMPOS_FORMATO_1[campo_atual], texto, pos_1, fim)
+            if match is None:
+                break
+            if campo_atual == 0:
+                cor = _nome_cor(match.group(1))
+                if cor is None: # Nenhum caractere de palavra após 'Color=': procura o próximo.
+                    pos_1 = match.start() + 1
+                    continue
+                nome, tamanho = cor
+                pos_1 = match.start(1) + tamanho # Retoma logo após o nome aparado.
+                registro.append(nome)
+                if nome.endswith(_FIM_NOME_NIVEL_1) and len(nome) > len(_FIM_NOME_NIVEL_1):
+                    alternativa = [1, pos_1 - len(_FIM_NOME_NIVEL_1), [nome[:-len(_FIM_NOME_NIVEL_1)]]]
+            else:
+                registro.append(match.group(1))
+            campo_atual += 1
+            if campo_atual == len(_CAMPOS_FORMATO_1):
+                registros_formato_2 = None # O Formato 1 prevalece sobre o Formato 2.
+                yield _registro(registro)
+                registro = []
+                campo_atual = 0
+                alternativa = None
+
+        while alternativa is not None and alternativa[0] < len(_CAMPOS_FORMATO_1):
+            match, alternativa[1] = _buscar(_CAMPOS_FORMATO_1[alternativa[0]], texto, alternativa[1], fim)
+            if match is None:
+                break
+            alternativa[2].append(match.group(1))
+            alternativa[0] += 1
+
+        # Formato 2: só precisa ser varrido enquanto o Formato 1 não aparecer.
+        corte = pos_1
+        if registros_formato_2 is not None:
+            while True:
+                match, pos_2 = _buscar(_CAMPO_FORMATO_2, texto, pos_2, fim)
+                if match is None:
+                    break
+                cor = _nome_cor(match.group(1), formato_2=True)
+                if cor is None: # Nome que a busca original não aceitaria: procura o próximo.
+                    pos_2 = match.start() + 1
+                    continue
+                registros_formato_2.append((cor[0],) + match.groups()[1:])
+            corte = min(corte, pos_2)
+        if alternativa is not None:
+            corte = min(corte, alternativa[1])
+
+        if tempos is not None:
+            tempos['extracao'] += time.perf_counter() - inicio
+
+        if not fim:
+            texto = texto[corte:] # Descarta o trecho já consumido, limitando a memória usada.
+            pos_1 -= corte
+            pos_2 = max(pos_2 - corte, 0)
+            if alternativa is not None:
+                alternativa[1] -= corte
+
+    if alternativa is not None and alternativa[0] == len(_CAMPOS_FORMATO_1): # O registro com o nome inteiro não se completou.
+        registros_formato_2 = None
+        yield _registro(alternativa[2])
+    if registros_formato_2 is None: # O Formato 1 já foi emitido.
+        return
+    if not registros_formato_2:
+        raise FormatoDesconhecidoError("Nenhum registro reconhecido no arquivo.")
+    for grupos in registros_formato_2:
+        yield _registro(grupos)
+
+
+def somar_canais(canais):
+    """
+    Acumula as tuplas (cor, l1, l2, l3) por nome de cor (como aparece no arquivo, sem normalizar).
+    Retorna {cor: [l1, l2, l3]} (inteiros), na ordem de primeira aparição.
+    """
+    totais = {}
+    for cor, dots_l1, dots_l2, dots_l3 in canais:
+        total = totais.get(cor)
+        if total is None:
+            totais[cor] = [int(dots_l1), int(dots_l2), int(dots_l3)]
+        else:
+            total[0] += int(dots_l1)
+            total[1] += int(dots_l2)
+            total[2] += int(dots_l3)
+    return totais
+
+
+def somar_canais_conteudo(conteudo):
+    """
+    Executada nos processos do pool: 'somar_canais' a partir dos bytes de um arquivo. Fica neste
+    módulo para que os processos não precisem importar a aplicação.
+    """
+    return somar_canais(extrair_canais(io.BytesIO(conteudo)))
+
+
+def somar_canais_caminho(caminho):
+    """Executada nos processos do pool para arquivos grandes: abre o arquivo pelo caminho e o varre (por mmap)."""
+    with open(caminho, 'rb') as stream:
+        return somar_canais(extrair_canais(stream))
@@ -0,0 +1,152 @@
+import os # Importa o módulo 'os', usado para ler a chave que ativa/desativa as métricas.
+import threading # Importa o módulo 'threading', pois as métricas são atualizadas por várias threads.
+import time # Importa o módulo 'time', usado para medir a duração de cada etapa.
+from collections import defaultdict # Dicionário com valor padrão, usado para acumular tempos e contadores.
+from contextlib import contextmanager # Usado para medir um bloco de código com 'with medir(...)'.
+from contextvars import ContextVar # Guarda a medição da requisição atual (uma por thread/contexto).
+
+# --- Métricas de Desempenho ---
+# Cada requisição de cálculo recebe uma 'Medicao' com o tempo de cada etapa e os contadores da
+# requisição. Ao final, ela vira o cabeçalho 'Server-Timing' e é somada ao registro global,
+# exportado no formato texto do Prometheus em '/metrics'.
+# CONSUMO_METRICAS=0 desativa tudo: nenhuma medição é criada e as chamadas abaixo viram no-op.
+
+ATIVADO = os.environ.get("CONSUMO_METRICAS", "1").lower() not in ("0", "false", "nao", "não")
+
+# Limites (em segundos) dos buckets do histograma de latência por linha.
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_medicao_atual = ContextVar("medicao_atual", default=None)
+
+
+class Medicao:
+    """Tempos por etapa (segundos) e contadores de uma única requisição."""
+
+    __slots__ = ("inicio", "linha", "etapas", "contadores")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.linha = None # Linha de produção da requisição (rótulo do histograma).
+        self.etapas = defaultdict(float) # etapa -> segundos acumulados.
+        self.contadores = defaultdict(int) # (nome, rótulo) -> valor.
+
+    def contar(self, nome, valor=1, rotulo=None):
+        self.contadores[(nome, rotulo)] += valor
+
+    def duracao(self):
+        return time.perf_counter() - self.inicio
+
+    def server_timing(self):
+        """Valor do cabeçalho 'Server-Timing' (durações em milissegundos)."""
+        partes = [f"{etapa};dur={segundos * 1000:.3f}" for etapa, segundos in self.etapas.items()]
+        partes.append(f"total;dur={self.duracao() * 1000:.3f}")
+        return ", ".join(partes)
+
+
+def iniciar_medicao():
+    """Cria a medição da requisição atual. Retorna (medicao, token) ou (None, None) se desativado."""
+    if not ATIVADO:
+        return None, None
+    medicao = Medicao()
+    return medicao, _medicao_atual.set(medicao)
+
+
+def encerrar_medicao(token):
+    """Desassocia a medição do contexto atual."""
+    if token is not None:
+        _medicao_atual.reset(token)
+
+
+def medicao_atual():
+    """Medição da requisição atual (None fora de uma requisição medida ou com as métricas desativadas)."""
+    return _medicao_atual.get()
+
+
+@contextmanager
+def medir(etapa):
+    """Soma a duração do bloco à etapa da medição atual (sem custo quando não há medição)."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.etapas[etapa] += time.perf_counter() - inicio
+
+
+def contar(nome, valor=1, rotulo=None):
+    """Incrementa um contador da medição atual (sem efeito quando não há medição)."""
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.contar(nome, valor, rotulo)
+
+
+class RegistroMetricas:
+    """Acumula as medições de todas as requisições e as exporta no formato do Prometheus."""
+
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = buckets
+        self._trava = threading.Lock()
+        self._histogramas = {} # linha -> [contagem por bucket..., soma, contagem]
+        self._etapas = defaultdict(float) # etapa -> segundos acumulados.
+        self._contadores = defaultdict(int) # (nome, rótulo) -> valor.
+
+    def registrar(self, medicao, duracao):
+        """Soma uma medição encerrada ao registro."""
+        with self._trava:
+            if medicao.linha is not None:
+                histograma = self._histogramas.setdefault(medicao.linha, [0] * len(self.buckets) + [0.0, 0])
+                for indice, limite in enumerate(self.buckets):
+                    if duracao <= limite:
+                        histograma[indice] += 1 # Buckets cumulativos ('le' = menor ou igual).
+                histograma[-2] += duracao
+                histograma[-1] += 1
+            for etapa, segundos in medicao.etapas.items():
+                self._etapas[etapa] += segundos
+            for chave, valor in medicao.contadores.items():
+                self._contadores[chave] += valor
+
+    def exportar(self, prefixo="consumo", extras=()):
+        """
+        Texto no formato de exposição do Prometheus. 'extras' é uma sequência de
+        (nome, tipo, ajuda, valor) com métricas adicionais (ex: estado do cache).
+        """
+        linhas = []
+        with self._trava:
+            nome = f"{prefixo}_requisicao_segundos"
+            linhas.append(f"# HELP {nome} Latência das requisições de cálculo por linha de produção.")
+            linhas.append(f"# TYPE {nome} histogram")
+            for linha, histograma in sorted(self._histogramas.items()):
+                for limite, contagem in zip(self.buckets, histograma):
+                    linhas.append(f'{nome}_bucket{{linha="{linha}",le="{limite}"}} {contagem}')
+                linhas.append(f'{nome}_bucket{{linha="{linha}",le="+Inf"}} {histograma[-1]}')
+                linhas.append(f'{nome}_sum{{linha="{linha}"}} {histograma[-2]}')
+                linhas.append(f'{nome}_count{{linha="{linha}"}} {histograma[-1]}')
+
+            nome = f"{prefixo}_etapa_segundos_total"
+            linhas.append(f"# HELP {nome} Tempo acumulado em cada etapa do processamento.")
+            linhas.append(f"# TYPE {nome} counter")
+            for etapa, segundos in sorted(self._etapas.items()):
+                linhas.append(f'{nome}{{etapa="{etapa}"}} {segundos}')
+
+            por_nome = defaultdict(list)
+            for (nome_contador, rotulo), valor in self._contadores.items():
+                por_nome[nome_contador].append((rotulo, valor))
+            for nome_contador, valores in sorted(por_nome.items()):
+                nome = f"{prefixo}_{nome_contador}_total"
+                linhas.append(f"# TYPE {nome} counter")
+                for rotulo, valor in sorted(valores, key=lambda item: str(item[0])):
+                    sufixo = f'{{motivo="{rotulo}"}}' if rotulo is not None else ""
+                    linhas.append(f"{nome}{sufixo} {valor}")
+
+        for nome_extra, tipo, ajuda, valor in extras:
+            nome = f"{prefixo}_{nome_extra}"
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            linhas.append(f"{nome} {valor}")
+        return "\n".join(linhas) + "\n"
+
+
+registro = RegistroMetricas() # Registro global do processo.
@@ -0,0 +1,66 @@
+import numpy as np # Importa o NumPy, usado para calcular o consumo de todas as linhas e cores de uma só vez.
+
+# --- Motor Vetorizado de Consumo ---
+# Compila o MAPA_LINHAS (uma única vez) em matrizes:
+#   densidades[linha, cor]    -> g/mL (NaN quando a cor não está mapeada na linha)
+#   gotas[linha, cor, nivel]  -> pL por dot de cada nível
+# As duas regras de volume viram a mesma soma 'dots[cor, nivel] * gotas[linha, cor, nivel]':
+#   "nivel": gotas[linha, cor, n] = pL do nível n (igual para todas as cores)
+#   "cor":   gotas[linha, cor, n] = pL da cor (igual para os três níveis), ou 0 se não mapeada
+NIVEIS = ('l1', 'l2', 'l3') # Chaves dos níveis nos dicionários de dots.
+
+
+class MotorConsumo:
+    """Calcula a massa (g) de cada cor para todas as linhas de produção em uma única operação matricial."""
+
+    def __init__(self, mapa_linhas):
+        self.linhas = list(mapa_linhas) # Ordem das linhas (eixo 0 das matrizes).
+        self.cores = list(dict.fromkeys(cor for config in mapa_linhas.values() for cor in config["densidades"])) # Eixo 1.
+        self._indice_linha = {linha: indice for indice, linha in enumerate(self.linhas)}
+        self._indice_cor = {cor: indice for indice, cor in enumerate(self.cores)}
+
+        valores_gotas = [valor for config in mapa_linhas.values() for valor in config["gotas"].values()]
+        tipo = np.int64 if all(isinstance(valor, int) for valor in valores_gotas) else np.float64 # Volumes inteiros são exatos.
+
+        # Maior contagem de dots cujo volume (soma de 3 produtos) ainda cabe em int64; acima dela, o
+        # volume é calculado com inteiros do Python (exatos, como no cálculo escalar).
+        maior_gota = max([abs(valor) for valor in valores_gotas] + [1])
+        self.limite_dots = np.iinfo(np.int64).max // int(np.ceil(maior_gota)) // len(NIVEIS)
+
+        self.densidades = np.full((len(self.linhas), len(self.cores)), np.nan)
+        self.gotas = np.zeros((len(self.linhas), len(self.cores), len(NIVEIS)), dtype=tipo)
+
+        for i, config in enumerate(mapa_linhas.values()):
+            for cor, densidade in config["densidades"].items():
+                self.densidades[i, self._indice_cor[cor]] = densidade
+            if config["tipo_gotas"] == "nivel": # Volume = sum(Dots_L_i * pL_L_i)
+                self.gotas[i, :, :] = [config["gotas"][nivel] for nivel in (1, 2, 3)]
+            elif config["tipo_gotas"] == "cor": # Volume = sum(Total_Dots * pL_Cor)
+                for cor, indice in self._indice_cor.items():
+                    self.gotas[i, indice, :] = config["gotas"].get(cor, 0)
+
+    def calcular_massas(self, max_dots, cores_na_ordem, fator_porcentagem, linhas=None):
+        """
+        Retorna (linhas, cores, massas): 'massas[linha, cor]' em gramas (sem arredondamento), NaN
+        quando a densidade da cor não está mapeada na linha. Cores desconhecidas por todas as linhas
+        são descartadas; 'cores' mantém a ordem de 'cores_na_ordem'.
+        """
+        linhas = self.linhas if linhas is None else list(linhas)
+        cores = [cor for cor in cores_na_ordem if cor in self._indice_cor and cor in max_dots]
+        indices_linhas = [self._indice_linha[linha] for linha in linhas]
+        indices_cores = [self._indice_cor[cor] for cor in cores]
+
+        valores = [[max_dots[cor][nivel] for nivel in NIVEIS] for cor in cores]
+        gotas = self.gotas[np.ix_(indices_linhas, indices_cores)] # [linha, cor, nivel]
+        densidades = self.densidades[np.ix_(indices_linhas, indices_cores)] # [linha, cor]
+
+        if all(abs(valor) <= self.limite_dots for linha_dots in valores for valor in linha_dots):
+            dots = np.array(valores, dtype=np.int64).reshape(len(cores), len(NIVEIS))
+            volume_pl = np.einsum('cn,lcn->lc', dots, gotas) # Volume (pL) de cada cor em cada linha.
+        else: # Contagens enormes: inteiros do Python evitam o overflow silencioso do int64.
+            dots = np.array(valores, dtype=object).reshape(len(cores), len(NIVEIS))
+            volume_pl = (dots[np.newaxis, :, :] * gotas.astype(object)).sum(axis=2)
+        volume_pl = volume_pl.astype(np.float64) # Lança OverflowError (como o cálculo escalar) acima de ~1e308.
+        # Mesma ordem de operações do cálculo escalar: ((pL * 1e-9) * densidade) * (1 + fator).
+        massas = (volume_pl * 1e-9) * densidades * (1 + fator_porcentagem)
+        return linhas, cores, massas
@@ -0,0 +1,206 @@
+import sys # Importa o módulo 'sys', usado para estimar a memória de cada sessão.
+import threading # Importa o módulo 'threading', pois as sessões são acessadas por várias requisições ao mesmo tempo.
+import time # Importa o módulo 'time', usado para o TTL das sessões.
+import uuid # Importa o módulo 'uuid', usado para gerar os identificadores de sessões e arquivos.
+from collections import OrderedDict # Dicionário ordenado: arquivos na ordem de envio e sessões na ordem de uso (LRU).
+
+from cache_dots import tamanho_sum_dots # Estimativa de memória do 'sum_dots' de cada arquivo.
+
+# --- Sessões de Upload ---
+# Uma sessão guarda o 'sum_dots' de cada arquivo enviado e mantém 'max_dots' e a ordem das cores
+# atualizados a cada inclusão/remoção. Recalcular com outra linha ou porcentagem não lê nenhum
+# arquivo: o custo é proporcional ao número de cores.
+
+NIVEIS = ('l1', 'l2', 'l3') # Chaves dos níveis nos dicionários de dots.
+
+
+class SessaoInexistenteError(KeyError):
+    """A sessão (ou o arquivo da sessão) não existe ou já expirou."""
+
+
+class LimiteSessaoError(ValueError):
+    """A sessão excederia o limite de memória."""
+
+
+def _tamanho_arquivo(nome, chave, sum_dots):
+    """Memória estimada de um arquivo guardado na sessão."""
+    return tamanho_sum_dots(sum_dots) + sys.getsizeof(nome) + sys.getsizeof(chave)
+
+
+class Sessao:
+    """Arquivos de uma sessão e os totais derivados deles ('max_dots' e cores na ordem de aparição)."""
+
+    def __init__(self, id_sessao):
+        self.id = id_sessao
+        self.arquivos = OrderedDict() # id_arquivo -> (nome, chave, sum_dots), na ordem de envio.
+        self.max_dots = {} # Máximo de dots por cor e nível entre os arquivos da sessão.
+        self.cores_na_ordem = [] # Cores únicas na ordem de primeira aparição (como em '/upload-multi').
+        self.bytes = sys.getsizeof(self) # Memória estimada da sessão.
+        self.ultimo_acesso = time.time()
+        self.trava = threading.Lock() # Serializa as alterações de uma mesma sessão.
+
+    def adicionar(self, nome, chave, sum_dots):
+        """Inclui um arquivo no fim da sessão e atualiza os máximos das suas cores. Retorna o id do arquivo."""
+        id_arquivo = uuid.uuid4().hex[:12]
+        self.arquivos[id_arquivo] = (nome, chave, sum_dots)
+        self.bytes += _tamanho_arquivo(nome, chave, sum_dots)
+
+        for cor_en, dots in sum_dots.items():
+            maximos = self.max_dots.get(cor_en)
+            if maximos is None: # Primeira aparição da cor: entra no fim da ordem.
+                self.max_dots[cor_en] = dict(dots)
+                self.cores_na_ordem.append(cor_en)
+                continue
+            for nivel in NIVEIS:
+                if dots[nivel] > maximos[nivel]:
+                    maximos[nivel] = dots[nivel]
+        return id_arquivo
+
+    def remover(self, id_arquivo):
+        """
+        Remove um arquivo da sessão. Só as cores em que ele definia algum máximo são recalculadas,
+        percorrendo os arquivos restantes.
+        """
+        introduzidas = set(self.arquivos[id_arquivo][2]) # Cores cuja primeira aparição é este arquivo.
+        for outro_id, (_, _, outros) in self.arquivos.items():
+            if outro_id == id_arquivo or not introduzidas:
+                break
+            introduzidas.difference_update(outros)
+
+        nome, chave, sum_dots = self.arquivos.pop(id_arquivo)
+        self.bytes -= _tamanho_arquivo(nome, chave, sum_dots)
+
+        afetadas = [cor_en for cor_en, dots in sum_dots.items()
+                    if any(dots[nivel] == self.max_dots[cor_en][nivel] for nivel in NIVEIS)]
+        for cor_en in afetadas:
+            maximos = None
+            for _, _, outros in self.arquivos.values():
+                dots = outros.get(cor_en)
+                if dots is None:
+                    continue
+                if maximos is None:
+                    maximos = dict(dots)
+                else:
+                    for nivel in NIVEIS:
+                        if dots[nivel] > maximos[nivel]:
+                            maximos[nivel] = dots[nivel]
+            if maximos is None:
+                del self.max_dots[cor_en] # Nenhum arquivo restante tem a cor.
+            else:
+                self.max_dots[cor_en] = maximos
+
+        # A ordem de primeira aparição só muda se o arquivo removido introduziu alguma cor. Se essas cores
+        # sumiram da sessão, basta retirá-las; se ainda aparecem em arquivos posteriores, a ordem é refeita.
+        if not introduzidas:
+            return
+        if introduzidas.isdisjoint(self.max_dots):
+            self.cores_na_ordem = [cor_en for cor_en in self.cores_na_ordem if cor_en not in introduzidas]
+        else:
+            self.cores_na_ordem = list(dict.fromkeys(cor_en for _, _, outros in self.arquivos.values() for cor_en in outros))
+
+    def chaves(self):
+        """Hash do conteúdo de cada arquivo, na ordem de envio."""
+        return [chave for _, chave, _ in self.arquivos.values()]
+
+    def resumo(self):
+        """Dados públicos da sessão (sem os totais de dots)."""
+        with self.trava: # Outra requisição pode estar alterando os arquivos da sessão.
+            return {
+                "id": self.id,
+                "arquivos": [{"id": id_arquivo, "nome": nome} for id_arquivo, (nome, _, _) in self.arquivos.items()],
+                "cores": list(self.cores_na_ordem),
+            }
+
+
+class GerenciadorSessoes:
+    """
+    Guarda as sessões em memória. Sessões sem acesso há mais de 'ttl_segundos' expiram; quando o
+    número de sessões ou a memória estimada passa dos limites, as menos usadas são descartadas.
+    """
+
+    def __init__(self, ttl_segundos=3600, max_sessoes=100, max_bytes=64 * 1024 * 1024):
+        self.ttl_segundos = ttl_segundos
+        self.max_sessoes = max_sessoes
+        self.max_bytes = max_bytes
+        self._sessoes = OrderedDict() # id -> Sessao; a menos usada fica no início.
+        self._trava = threading.Lock()
+        self.evictions = 0 # Sessões descartadas por limite (não conta as expiradas).
+
+    def criar(self):
+        sessao = Sessao(uuid.uuid4().hex)
+        with self._trava:
+            self._limpar_expiradas()
+            self._sessoes[sessao.id] = sessao
+            self._aplicar_limites(preservar=sessao.id)
+        return sessao
+
+    def obter(self, id_sessao):
+        """Retorna a sessão (marcando-a como usada) ou lança SessaoInexistenteError."""
+        with self._trava:
+            self._limpar_expiradas()
+            sessao = self._sessoes.get(id_sessao)
+            if sessao is None:
+                raise SessaoInexistenteError(id_sessao)
+            sessao.ultimo_acesso = time.time()
+            self._sessoes.move_to_end(id_sessao)
+            return sessao
+
+    def adicionar_arquivos(self, sessao, arquivos):
+        """
+        Inclui os arquivos [(nome, chave, sum_dots), ...] na sessão. Lança LimiteSessaoError (sem alterar a
+        sessão) se ela sozinha ultrapassar o limite de memória, ou SessaoInexistenteError se ela já tiver
+        sido descartada. Retorna os ids dos arquivos incluídos.
+        """
+        acrescimo = sum(_tamanho_arquivo(nome, chave, sum_dots) for nome, chave, sum_dots in arquivos)
+        with self._trava: # Impede que a sessão seja descartada entre a verificação e a inclusão.
+            self._verificar_registrada(sessao)
+            with sessao.trava:
+                if sessao.bytes + acrescimo > self.max_bytes:
+                    raise LimiteSessaoError("A sessão excede o limite de memória.")
+                ids = [sessao.adicionar(nome, chave, sum_dots) for nome, chave, sum_dots in arquivos]
+            self._aplicar_limites(preservar=sessao.id)
+        return ids
+
+    def remover_arquivo(self, sessao, id_arquivo):
+        """Remove um arquivo da sessão. Lança SessaoInexistenteError se a sessão ou o arquivo não existirem."""
+        with self._trava:
+            self._verificar_registrada(sessao)
+            with sessao.trava:
+                if id_arquivo not in sessao.arquivos:
+                    raise SessaoInexistenteError(id_arquivo)
+                sessao.remover(id_arquivo)
+
+    def excluir(self, id_sessao):
+        with self._trava:
+            if self._sessoes.pop(id_sessao, None) is None:
+                raise SessaoInexistenteError(id_sessao)
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                "sessoes": len(self._sessoes),
+                "bytes": sum(sessao.bytes for sessao in self._sessoes.values()),
+                "evictions": self.evictions,
+            }
+
+    def _verificar_registrada(self, sessao):
+        """Lança SessaoInexistenteError se a sessão (obtida antes) já foi descartada ou excluída."""
+        if self._sessoes.get(sessao.id) is not sessao:
+            raise SessaoInexistenteError(sessao.id)
+
+    def _limpar_expiradas(self):
+        limite = time.time() - self.ttl_segundos
+        expiradas = [id_sessao for id_sessao, sessao in self._sessoes.items() if sessao.ultimo_acesso < limite]
+        for id_sessao in expiradas:
+            del self._sessoes[id_sessao]
+
+    def _aplicar_limites(self, preservar):
+        """Descarta as sessões menos usadas (exceto 'preservar') até respeitar os limites."""
+        total = sum(sessao.bytes for sessao in self._sessoes.values())
+        for id_sessao in list(self._sessoes):
+            if len(self._sessoes) <= self.max_sessoes and total <= self.max_bytes:
+                break
+            if id_sessao == preservar:
+                continue
+            total -= self._sessoes.pop(id_sessao).bytes
+            self.evictions += 1
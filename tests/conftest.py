@@ -0,0 +1,8 @@
+import os # Importa o módulo 'os', usado para configurar a aplicação antes de importá-la.
+import sys # Importa o módulo 'sys', usado para importar os módulos da raiz do repositório.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+os.environ.setdefault("CONSUMO_HISTORICO_DB", "") # Os testes não gravam no histórico do servidor.
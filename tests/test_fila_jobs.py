@@ -0,0 +1,106 @@
+import io # Importa o módulo 'io', usado para enviar os arquivos como streams.
+import time # Importa o módulo 'time', usado para simular a passagem do tempo (TTL).
+
+import pytest
+
+import app as aplicacao
+import fila_jobs
+from fila_jobs import CONCLUIDO, ERRO, PENDENTE, FilaCheiaError, FilaJobs
+
+# --- Fila de Jobs ---
+# Os jobs são executados na própria thread do teste ('iniciar_workers=False' e 'executar_proximo()').
+
+ARQUIVO_RIP = b'Color=Cyan Dots_Level_1=1000 Dots_Level_2=2000 Dots_Level_3=3000\n' \
+              b'Color=Black Dots_Level_1=500 Dots_Level_2=0 Dots_Level_3=10\n'
+
+
+class Relogio:
+    """Substitui o módulo 'time' da fila, permitindo avançar o tempo sem esperar."""
+
+    def __init__(self):
+        self.agora = time.time()
+
+    def time(self):
+        return self.agora
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    fila = FilaJobs(max_pendentes=2, ttl_segundos=60, tratar_erro=aplicacao._tratar_erro_job, iniciar_workers=False)
+    monkeypatch.setattr(aplicacao, 'fila_jobs', fila)
+    aplicacao.app.config['TESTING'] = True
+    with aplicacao.app.test_client() as cliente:
+        cliente.fila = fila
+        yield cliente
+
+
+def dados_upload(linha='TRIMS', porcentagem='5', conteudo=ARQUIVO_RIP):
+    return {'linha': linha, 'porcentagem': porcentagem, 'files[]': [(io.BytesIO(conteudo), 'arquivo.rip')]}
+
+
+def test_job_retorna_o_mesmo_json_de_upload_multi(cliente):
+    esperado = cliente.post('/upload-multi', data=dados_upload())
+    assert esperado.status_code == 200
+
+    resposta = cliente.post('/jobs', data=dados_upload())
+    assert resposta.status_code == 202
+    id_job = resposta.get_json()['id']
+    assert resposta.headers['Location'].endswith(f'/jobs/{id_job}')
+    assert cliente.get(f'/jobs/{id_job}').get_json()['status'] == PENDENTE
+
+    assert cliente.fila.executar_proximo()
+    job = cliente.get(f'/jobs/{id_job}').get_json()
+    assert job['status'] == CONCLUIDO
+    assert job['resultado'] == esperado.get_json()
+
+
+def test_job_com_erro_retorna_o_erro_de_upload_multi(cliente):
+    esperado = cliente.post('/upload-multi', data=dados_upload(conteudo=b'sem registros'))
+    assert esperado.status_code == 400
+
+    id_job = cliente.post('/jobs', data=dados_upload(conteudo=b'sem registros')).get_json()['id']
+    cliente.fila.executar_proximo()
+    job = cliente.get(f'/jobs/{id_job}').get_json()
+    assert job['status'] == ERRO
+    assert job['resultado'] == esperado.get_json()
+
+
+def test_fila_cheia_retorna_503_com_retry_after(cliente):
+    for _ in range(2): # max_pendentes=2
+        assert cliente.post('/jobs', data=dados_upload()).status_code == 202
+    resposta = cliente.post('/jobs', data=dados_upload())
+    assert resposta.status_code == 503
+    assert int(resposta.headers['Retry-After']) > 0
+    assert 'error' in resposta.get_json()
+
+    cliente.fila.executar_proximo() # Com um job a menos na fila, o envio volta a ser aceito.
+    assert cliente.post('/jobs', data=dados_upload()).status_code == 202
+
+
+def test_job_finalizado_expira_apos_o_ttl(cliente, monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(fila_jobs, 'time', relogio)
+    id_job = cliente.post('/jobs', data=dados_upload()).get_json()['id']
+    cliente.fila.executar_proximo()
+
+    relogio.agora += 59
+    assert cliente.get(f'/jobs/{id_job}').status_code == 200
+    relogio.agora += 2
+    assert cliente.get(f'/jobs/{id_job}').status_code == 404
+
+
+def test_job_pendente_nao_expira(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(fila_jobs, 'time', relogio)
+    fila = FilaJobs(ttl_segundos=1, iniciar_workers=False)
+    id_job = fila.enviar(lambda: {})
+    relogio.agora += 10
+    assert fila.consultar(id_job)['status'] == PENDENTE
+
+
+def test_fila_cheia_libera_o_job_recusado():
+    fila = FilaJobs(max_pendentes=1, iniciar_workers=False)
+    fila.enviar(lambda: {})
+    with pytest.raises(FilaCheiaError):
+        fila.enviar(lambda: {})
+    assert fila.estatisticas()[PENDENTE] == 1
@@ -0,0 +1,113 @@
+import io # Importa o módulo 'io', usado para enviar o conteúdo dos arquivos como streams.
+import random # Importa o módulo 'random', usado para gerar os arquivos do teste diferencial.
+import re # Importa o módulo 're', usado para a busca original (referência).
+
+import pytest
+
+import leitor_rip
+from leitor_rip import FormatoDesconhecidoError, extrair_canais
+
+# --- Leitor RIP x Busca Original ---
+# O leitor incremental reproduz, nos bytes e bloco a bloco, as duas buscas feitas antes sobre o texto
+# inteiro do arquivo. Estes testes comparam os dois em arquivos gerados e em casos conhecidos.
+
+REGEX_FORMATO_1 = r'Color=(\w+).*?Dots_Level_1=(\d+).*?Dots_Level_2=(\d+).*?Dots_Level_3=(\d+)'
+REGEX_FORMATO_2 = r'tif_(\w+)\s*=\s*(\d+),(\d+),(\d+)'
+TAMANHOS_BLOCO = [1, 3, 7, 64 * 1024]
+
+
+def busca_original(conteudo):
+    """Registros encontrados pela busca original (o Formato 1 prevalece sobre o Formato 2)."""
+    texto = conteudo.decode('utf-8')
+    return re.findall(REGEX_FORMATO_1, texto, re.DOTALL) or re.findall(REGEX_FORMATO_2, texto)
+
+
+def extrair(stream, tamanho_bloco=leitor_rip.TAMANHO_BLOCO):
+    try:
+        return list(extrair_canais(stream, tamanho_bloco))
+    except FormatoDesconhecidoError:
+        return [] # A busca original devolve uma lista vazia.
+
+
+def extrair_mmap(conteudo, tmp_path, monkeypatch):
+    monkeypatch.setattr(leitor_rip, 'TAMANHO_MINIMO_MMAP', 1) # Todo arquivo em disco é mapeado.
+    caminho = tmp_path / 'arquivo.rip'
+    caminho.write_bytes(conteudo)
+    with open(caminho, 'rb') as stream:
+        return extrair(stream)
+
+
+# Trechos dos arquivos gerados: nomes e separadores que exercitam o aparo do nome da cor, os espaços
+# Unicode, o retrocesso da busca preguiçosa e os campos incompletos.
+NOMES = ['Cyan', 'Cyan’', 'Mag\xa0', 'é', 'ção', 'A_1', 'XDots_Level_1', 'Dots_Level_1', '’', '',
+         'Dots_Level_tifDots_Level_1', 'a b']
+RUIDOS = ['', '', '', '', ' ', '\n', '\xa0', 'x', '’', '=', 'Dots_Level_1', '　', '\x1c', ',']
+NUMEROS = ['', '0', '12', '345', '7']
+
+
+def _registro_formato_1(aleatorio):
+    partes = ['Color=', aleatorio.choice(NOMES), aleatorio.choice(RUIDOS)]
+    for nivel in (1, 2, 3):
+        if aleatorio.random() > 0.02: # Às vezes falta um campo.
+            partes += [aleatorio.choice(RUIDOS), f'Dots_Level_{nivel}=', aleatorio.choice(NUMEROS)]
+    return ''.join(partes)
+
+
+def _registro_formato_2(aleatorio):
+    numeros = ','.join(aleatorio.choice(NUMEROS) for _ in range(3))
+    return f'tif_{aleatorio.choice(NOMES)}{aleatorio.choice(RUIDOS)}{aleatorio.choice(["=", "", "= "])}{aleatorio.choice(RUIDOS)}{numeros}'
+
+
+def arquivos_gerados(quantidade, semente=0):
+    aleatorio = random.Random(semente)
+    for _ in range(quantidade):
+        gerar = aleatorio.choice([_registro_formato_1, _registro_formato_2, None])
+        registros = []
+        for _ in range(aleatorio.randint(1, 4)):
+            registros.append((gerar or aleatorio.choice([_registro_formato_1, _registro_formato_2]))(aleatorio))
+        yield aleatorio.choice(RUIDOS).join(registros).encode('utf-8')
+
+
+@pytest.mark.parametrize('tamanho_bloco', TAMANHOS_BLOCO)
+def test_igual_a_busca_original_em_blocos(tamanho_bloco):
+    for conteudo in arquivos_gerados(1500):
+        assert extrair(io.BytesIO(conteudo), tamanho_bloco) == busca_original(conteudo), conteudo
+
+
+def test_igual_a_busca_original_com_mmap(tmp_path, monkeypatch):
+    for conteudo in arquivos_gerados(300, semente=1):
+        assert extrair_mmap(conteudo, tmp_path, monkeypatch) == busca_original(conteudo), conteudo
+
+
+CASOS = [
+    # Retrocesso: 'Dots_Level_1=' começa dentro do nome, pois o nome inteiro não completa um registro.
+    'Color=XDots_Level_1=0 Dots_Level_2=2 Dots_Level_3=3',
+    'Color=Dots_Level_tifDots_Level_1=0 Dots_Level_2=2 Dots_Level_3=3',
+    # Sem retrocesso: o nome inteiro completa um registro com os campos seguintes.
+    'Color=XDots_Level_1=1 Dots_Level_2=2 Dots_Level_3=3 Color=B Dots_Level_1=4 Dots_Level_2=5 Dots_Level_3=6',
+    # Registros do Formato 2 antes (e depois) do primeiro registro do Formato 1: só o Formato 1 vale.
+    'tif_Cyan=1,2,3\ntif_Black=4,5,6\nColor=Blue Dots_Level_1=7 Dots_Level_2=8 Dots_Level_3=9\ntif_Pink=1,1,1',
+    # Nome da cor aparado no primeiro caractere que não é de palavra.
+    'Color=Cyan’ Dots_Level_1=1 Dots_Level_2=2 Dots_Level_3=3',
+    # Espaços Unicode em volta do '=' do Formato 2.
+    'tif_Cyan\xa0= 1,2,3\ntif_Black　=\xa04,5,6',
+    # Nome do Formato 2 seguido de algo que não é espaço: o registro é ignorado.
+    'tif_Cyan’=1,2,3\ntif_Black=4,5,6',
+    # Registro longo, com campos e números cortados entre blocos de qualquer tamanho.
+    'Color=Yellow ' + 'x' * 5000 + ' Dots_Level_1=123456789 Dots_Level_2=' + '9' * 40 + ' Dots_Level_3=0',
+]
+
+
+@pytest.mark.parametrize('texto', CASOS)
+def test_casos_conhecidos(texto, tmp_path, monkeypatch):
+    conteudo = texto.encode('utf-8')
+    esperado = busca_original(conteudo)
+    assert esperado # Cada caso tem ao menos um registro.
+    for tamanho_bloco in TAMANHOS_BLOCO + [2, 13, 4096]:
+        assert extrair(io.BytesIO(conteudo), tamanho_bloco) == esperado
+    assert extrair_mmap(conteudo, tmp_path, monkeypatch) == esperado
+
+
+def test_formato_desconhecido():
+    with pytest.raises(FormatoDesconhecidoError):
+        list(extrair_canais(io.BytesIO(b'arquivo sem registros')))
@@ -0,0 +1,30 @@
+import io # Importa o módulo 'io', usado para enviar os arquivos como streams.
+
+import pytest
+
+import app as aplicacao
+import metricas
+
+# --- Métricas ---
+
+ARQUIVO_RIP = b'tif_Cyan=1,2,3\ntif_Desconhecida=1,2,3\ntif_Luster=4,5,6\n' # Uma cor sem densidade em nenhuma linha.
+
+
+def contador(cliente, nome):
+    for linha in cliente.get('/metrics').get_data(as_text=True).splitlines():
+        if linha.startswith(nome + ' '):
+            return float(linha.split()[1])
+    return 0.0
+
+
+@pytest.mark.skipif(not metricas.ATIVADO, reason="métricas desativadas (CONSUMO_METRICAS=0)")
+@pytest.mark.parametrize('rota, campos', [
+    ('/upload-multi', {'linha': 'TRIMS'}),
+    ('/upload-multi/linhas', {}), # Todas as linhas em uma requisição.
+])
+def test_cores_sem_densidade_contadas_uma_vez_por_requisicao(rota, campos):
+    cliente = aplicacao.app.test_client()
+    antes = contador(cliente, 'consumo_cores_sem_densidade_total')
+    resposta = cliente.post(rota, data={'porcentagem': '5', 'files[]': [(io.BytesIO(ARQUIVO_RIP), 'a.rip')], **campos})
+    assert resposta.status_code == 200
+    assert contador(cliente, 'consumo_cores_sem_densidade_total') - antes == 1
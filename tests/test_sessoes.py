@@ -0,0 +1,41 @@
+import pytest
+
+from sessoes import GerenciadorSessoes, SessaoInexistenteError
+
+# --- Sessões de Upload ---
+
+SUM_DOTS = {"Cyan": {"l1": 1, "l2": 2, "l3": 3}}
+
+
+def test_sessao_descartada_nao_recebe_arquivos():
+    sessoes = GerenciadorSessoes(max_sessoes=1)
+    sessao = sessoes.criar()
+    sessoes.criar() # Descarta a primeira sessão (limite de sessões).
+    with pytest.raises(SessaoInexistenteError):
+        sessoes.adicionar_arquivos(sessao, [("a.rip", "chave", SUM_DOTS)])
+    assert not sessao.arquivos
+
+
+def test_sessao_excluida_nao_remove_arquivos():
+    sessoes = GerenciadorSessoes()
+    sessao = sessoes.criar()
+    [id_arquivo] = sessoes.adicionar_arquivos(sessao, [("a.rip", "chave", SUM_DOTS)])
+    sessoes.excluir(sessao.id)
+    with pytest.raises(SessaoInexistenteError):
+        sessoes.remover_arquivo(sessao, id_arquivo)
+
+
+def test_remover_arquivo_mantem_a_ordem_das_cores():
+    sessoes = GerenciadorSessoes()
+    sessao = sessoes.criar()
+    ids = sessoes.adicionar_arquivos(sessao, [
+        ("a.rip", "a", {"Cyan": SUM_DOTS["Cyan"], "Black": SUM_DOTS["Cyan"]}),
+        ("b.rip", "b", {"Blue": SUM_DOTS["Cyan"], "Black": SUM_DOTS["Cyan"]}),
+        ("c.rip", "c", {"Cyan": SUM_DOTS["Cyan"]}),
+    ])
+    sessoes.remover_arquivo(sessao, ids[0]) # Introduziu 'Cyan' e 'Black', que ainda aparecem depois.
+    assert sessao.resumo()["cores"] == ["Blue", "Black", "Cyan"]
+    sessoes.remover_arquivo(sessao, ids[2]) # Introduziu 'Cyan', que some da sessão.
+    assert sessao.resumo()["cores"] == ["Blue", "Black"]
+    sessoes.remover_arquivo(sessao, ids[1]) # A última: nenhuma cor resta.
+    assert sessao.resumo()["cores"] == []